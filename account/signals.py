@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.conf import settings
+from bookmarks.thumbnails import ThumbnailService
 from .models import Profile
 
 
@@ -16,4 +17,18 @@ def save_user_profile(sender, instance, **kwargs):
     if hasattr(instance, "profile"):
         instance.profile.save()
     else:
-        Profile.objects.get_or_create(user=instance)
\ No newline at end of file
+        Profile.objects.get_or_create(user=instance)
+
+
+@receiver(post_init, sender=Profile)
+def remember_profile_photo(sender, instance, **kwargs):
+    # Read the raw value so a deferred photo field is not fetched.
+    photo = instance.__dict__.get('photo')
+    instance._loaded_photo_name = getattr(photo, 'name', photo)
+
+
+@receiver(post_save, sender=Profile)
+def generate_profile_thumbnails(sender, instance, **kwargs):
+    if instance.photo.name != instance._loaded_photo_name:
+        instance._loaded_photo_name = instance.photo.name
+        ThumbnailService.generate_later(instance.photo)
@@ -9,41 +9,53 @@ from django.views.decorators.http import require_POST
 from django.views.generic import ListView, DetailView
 from django.utils.decorators import method_decorator
 
+from actions.feed import FeedService
 from actions.models import Action
+from actions.snapshots import ActionSnapshotService
 from actions.utils import create_action
+from bookmarks.pagination import CursorPaginationMixin, IdCursorPaginator
+from images.recommendations import ImageRecommendationService
+from images.services import ImageThumbnailService
 from .forms import UserRegistrationForm, UserEditForm, ProfileEditForm
 from .models import Contact, Profile
 
 User = get_user_model()
 
 
-class DashboardView(LoginRequiredMixin, ListView):
+class DashboardView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     template_name = 'account/dashboard.html'
     context_object_name = 'actions'
     paginate_by = 10
 
     def get_queryset(self):
-        following_ids = self.request.user.following.values_list('id', flat=True)
-        queryset = Action.objects.exclude(user=self.request.user)
-        
+        feed_service = FeedService()
+        following_ids = feed_service.get_following_ids(self.request.user.id)
+
         if following_ids:
-            queryset = queryset.filter(user_id__in=following_ids)
-        
-        return queryset.select_related('user', 'user__profile').prefetch_related('target')
+            return feed_service.get_feed(self.request.user, following_ids)
+
+        return Action.objects.exclude(user=self.request.user).with_targets(skip_snapshotted=True)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['section'] = 'dashboard'
         context['total_images'] = self.request.user.images_created.count()
+        ActionSnapshotService.attach_thumbnails(context['actions'])
+        context['recommended_images'] = ImageThumbnailService.attach_pictures(
+            ImageRecommendationService.for_user(self.request.user), 'ranking'
+        )
         return context
 
 
 @method_decorator(login_required, name='dispatch')
-class UserListView(ListView):
+class UserListView(CursorPaginationMixin, ListView):
     model = User
     template_name = 'account/user/list.html'
     context_object_name = 'users'
     paginate_by = 12
+    # auth_user.date_joined is not indexed; ids follow join order.
+    paginator_class = IdCursorPaginator
+    cursor_field = 'id'
 
     def get_queryset(self):
         return User.objects.filter(is_active=True).select_related('profile')
@@ -68,7 +80,11 @@ class UserDetailView(DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['section'] = 'people'
-        context['user_images'] = self.object.images_created.all()[:12]
+        context['user_images'] = ImageThumbnailService.attach_pictures(
+            list(self.object.images_created.ready()[:12]), 'list'
+        )
+        context['user_actions'] = list(self.object.actions.with_targets(skip_snapshotted=True)[:10])
+        ActionSnapshotService.attach_thumbnails(context['user_actions'])
         return context
 
 
@@ -106,6 +122,7 @@ def edit_profile_view(request):
             with transaction.atomic():
                 user_form.save()
                 profile_form.save()
+                ActionSnapshotService.mark_user_stale(request.user)
                 messages.success(request, 'Profile updated successfully')
                 return redirect('account:dashboard')
         else:
@@ -144,11 +161,18 @@ def user_follow_view(request):
                 )
                 if created:
                     create_action(request.user, 'started following', user_to_follow)
+                    transaction.on_commit(
+                        lambda: FeedService().follow(request.user.id, user_to_follow.id)
+                    )
             else:
-                Contact.objects.filter(
+                deleted, _ = Contact.objects.filter(
                     user_from=request.user,
                     user_to=user_to_follow
                 ).delete()
+                if deleted:
+                    transaction.on_commit(
+                        lambda: FeedService().unfollow(request.user.id, user_to_follow.id)
+                    )
 
         return JsonResponse({'status': 'ok'})
         
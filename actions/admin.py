@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Action
+from .models import Action, ActionDailyRollup
 
 
 
@@ -28,5 +28,14 @@ class ActionAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related(
             'user', 'target_ct'
-        ).prefetch_related('target')
+        ).with_targets()
 
+
+
+@admin.register(ActionDailyRollup)
+class ActionDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ["day", "user", "verb", "total"]
+    list_filter = ["day", "verb"]
+    search_fields = ["user__username"]
+    raw_id_fields = ["user"]
+    list_per_page = 20
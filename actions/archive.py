@@ -0,0 +1,100 @@
+import datetime
+import gzip
+import json
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Action, ActionDailyRollup, ArchivedAction
+
+
+class ActionArchiveService:
+    """
+    Moves actions older than the retention window out of `actions_action`,
+    either into `ArchivedAction` or into a gzipped JSONL file. Each batch is
+    copied and deleted in its own short transaction so writers are never
+    blocked for long.
+    """
+    FIELDS = ('id', 'user_id', 'verb', 'created', 'target_ct_id', 'target_id')
+
+    def __init__(self, days=None, batch_size=None, path=None, rollups=True, pause=0):
+        self.days = days if days is not None else settings.ACTION_RETENTION_DAYS
+        self.batch_size = batch_size or settings.ACTION_ARCHIVE_BATCH_SIZE
+        self.path = path
+        self.rollups = rollups
+        self.pause = pause
+
+    def get_cutoff(self):
+        return timezone.now() - datetime.timedelta(days=self.days)
+
+    def run(self, max_batches=None):
+        cutoff = self.get_cutoff()
+        total = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            archived = self.archive_batch(cutoff)
+            if not archived:
+                break
+            total += archived
+            batches += 1
+            if self.pause:
+                time.sleep(self.pause)
+        return total
+
+    def archive_batch(self, cutoff):
+        with transaction.atomic():
+            rows = list(
+                Action.objects.filter(created__lt=cutoff)
+                .order_by('id')
+                .values(*self.FIELDS)[:self.batch_size]
+            )
+            if not rows:
+                return 0
+
+            if self.path:
+                self._write_file(rows)
+            else:
+                ArchivedAction.objects.bulk_create(
+                    [ArchivedAction(**row) for row in rows],
+                    ignore_conflicts=True
+                )
+            if self.rollups:
+                self._update_rollups(rows)
+
+            Action.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        return len(rows)
+
+    def _write_file(self, rows):
+        with gzip.open(self.path, 'at', encoding='utf-8') as archive:
+            for row in rows:
+                archive.write(json.dumps(dict(row, created=row['created'].isoformat())))
+                archive.write('\n')
+
+    def _update_rollups(self, rows):
+        counts = Counter(
+            (timezone.localdate(row['created']), row['user_id'], row['verb'])
+            for row in rows
+        )
+        existing = {
+            (rollup.day, rollup.user_id, rollup.verb): rollup
+            for rollup in ActionDailyRollup.objects.filter(
+                day__in={day for day, _, _ in counts},
+                user_id__in={user_id for _, user_id, _ in counts},
+            )
+        }
+
+        to_update = []
+        to_create = []
+        for (day, user_id, verb), total in counts.items():
+            rollup = existing.get((day, user_id, verb))
+            if rollup is None:
+                to_create.append(ActionDailyRollup(day=day, user_id=user_id, verb=verb, total=total))
+            else:
+                rollup.total += total
+                to_update.append(rollup)
+
+        ActionDailyRollup.objects.bulk_create(to_create)
+        ActionDailyRollup.objects.bulk_update(to_update, ['total'])
@@ -0,0 +1,211 @@
+import logging
+
+import redis
+from django.conf import settings
+from django.db.models import Count
+
+from account.models import Contact
+from bookmarks.pagination import keyset_slice
+from bookmarks.redis_client import get_redis_client
+from .models import Action
+
+logger = logging.getLogger(__name__)
+
+
+class FeedService:
+    """
+    Fan-out-on-write activity feeds.
+
+    Every action is pushed into a capped sorted set per follower (scored by
+    action id, so newest first) once that follower's feed has been built;
+    feeds are built in full from the database on first read. Authors with more than
+    ACTIVITY_FEED_FANOUT_LIMIT followers are not fanned out; their actions
+    are pulled from the database when a follower reads the feed.
+    """
+    FEED_KEY = 'feed:{user_id}'
+    PULL_AUTHORS_KEY = 'feed:pull_authors'
+
+    def __init__(self):
+        self.redis_client = get_redis_client()
+        self.max_length = settings.ACTIVITY_FEED_MAX_LENGTH
+        self.fanout_limit = settings.ACTIVITY_FEED_FANOUT_LIMIT
+
+    def feed_key(self, user_id):
+        return self.FEED_KEY.format(user_id=user_id)
+
+    def fan_out(self, action):
+        follower_ids = list(
+            Contact.objects.filter(user_to_id=action.user_id)
+            .values_list('user_from_id', flat=True)[:self.fanout_limit + 1]
+        )
+
+        try:
+            if len(follower_ids) > self.fanout_limit:
+                self.redis_client.sadd(self.PULL_AUTHORS_KEY, action.user_id)
+                return
+            self.redis_client.srem(self.PULL_AUTHORS_KEY, action.user_id)
+            self._push_to_built_feeds([self.feed_key(follower_id) for follower_id in follower_ids], [action.id])
+        except redis.RedisError:
+            logger.exception('Could not fan out action %s', action.id)
+
+    def follow(self, user_id, followed_id):
+        try:
+            if self.redis_client.sismember(self.PULL_AUTHORS_KEY, followed_id):
+                return
+            action_ids = self._recent_action_ids([followed_id])
+            if action_ids:
+                self._push_to_built_feeds([self.feed_key(user_id)], action_ids)
+        except redis.RedisError:
+            logger.exception('Could not add user %s to feed of %s', followed_id, user_id)
+
+    def unfollow(self, user_id, unfollowed_id):
+        action_ids = self._recent_action_ids([unfollowed_id])
+        if not action_ids:
+            return
+        try:
+            self.redis_client.zrem(self.feed_key(user_id), *action_ids)
+        except redis.RedisError:
+            logger.exception('Could not remove user %s from feed of %s', unfollowed_id, user_id)
+
+    def rebuild(self, user_id, following_ids=None, pull_authors=None):
+        if following_ids is None:
+            following_ids = self.get_following_ids(user_id)
+        if pull_authors is None:
+            pull_authors = self.get_pull_authors()
+
+        push_ids = [author_id for author_id in following_ids if author_id not in pull_authors]
+        action_ids = self._recent_action_ids(push_ids) if push_ids else []
+
+        pipe = self.redis_client.pipeline()
+        pipe.delete(self.feed_key(user_id))
+        if action_ids:
+            self._push(pipe, self.feed_key(user_id), action_ids)
+        pipe.execute()
+        return len(action_ids)
+
+    def refresh_pull_authors(self):
+        author_ids = list(
+            Contact.objects.values('user_to')
+            .annotate(total_followers=Count('id'))
+            .filter(total_followers__gt=self.fanout_limit)
+            .values_list('user_to', flat=True)
+        )
+        pipe = self.redis_client.pipeline()
+        pipe.delete(self.PULL_AUTHORS_KEY)
+        if author_ids:
+            pipe.sadd(self.PULL_AUTHORS_KEY, *author_ids)
+        pipe.execute()
+        return set(author_ids)
+
+    def get_pull_authors(self):
+        return {int(author_id) for author_id in self.redis_client.smembers(self.PULL_AUTHORS_KEY)}
+
+    def get_following_ids(self, user_id):
+        return list(
+            Contact.objects.filter(user_from_id=user_id)
+            .values_list('user_to_id', flat=True)
+        )
+
+    def get_feed(self, user, following_ids):
+        return ActivityFeed(self, user, following_ids)
+
+    def _push_to_built_feeds(self, keys, action_ids):
+        """
+        Push `action_ids` into those of `keys` that already hold a feed. A
+        missing feed (new user, Redis restart, eviction) is left missing so
+        that its first read rebuilds it in full instead of finding a feed
+        holding only the actions pushed since.
+        """
+        if not keys:
+            return
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.exists(key)
+        built = [key for key, exists in zip(keys, pipe.execute()) if exists]
+        if not built:
+            return
+        for key in built:
+            self._push(pipe, key, action_ids)
+        pipe.execute()
+
+    def _push(self, pipe, key, action_ids):
+        pipe.zadd(key, {action_id: action_id for action_id in action_ids})
+        pipe.zremrangebyrank(key, 0, -self.max_length - 1)
+
+    def _recent_action_ids(self, author_ids, limit=None):
+        return list(
+            Action.objects.filter(user_id__in=author_ids)
+            .order_by('-created', '-id')
+            .values_list('id', flat=True)[:limit or self.max_length]
+        )
+
+
+class ActivityFeed:
+    """
+    Keyset-seekable view of a user's materialized feed, suitable for
+    CursorPaginator. Falls back to a live query if Redis is unavailable.
+    """
+
+    def __init__(self, service, user, following_ids):
+        self.service = service
+        self.user = user
+        self.following_ids = list(following_ids)
+        self._state = None
+
+    def _load_state(self):
+        if self._state is not None:
+            return self._state
+
+        key = self.service.feed_key(self.user.id)
+        pipe = self.service.redis_client.pipeline(transaction=False)
+        pipe.exists(key)
+        pipe.smembers(self.service.PULL_AUTHORS_KEY)
+        feed_exists, pull_authors = pipe.execute()
+
+        pull_authors = {int(author_id) for author_id in pull_authors}
+        pull_ids = [author_id for author_id in self.following_ids if author_id in pull_authors]
+
+        if not feed_exists:
+            self.service.rebuild(self.user.id, self.following_ids, pull_authors)
+
+        self._state = (key, pull_ids)
+        return self._state
+
+    def _get_fallback(self):
+        return (
+            Action.objects.exclude(user=self.user)
+            .filter(user_id__in=self.following_ids)
+            .with_targets(skip_snapshotted=True)
+        )
+
+    def seek(self, position, reverse, limit):
+        try:
+            action_ids = self._get_action_ids(position, reverse, limit)
+        except redis.RedisError:
+            logger.exception('Feed unavailable for user %s', self.user.id)
+            return keyset_slice(self._get_fallback(), 'created', position, reverse, limit)
+
+        actions = Action.objects.with_targets(skip_snapshotted=True).in_bulk(action_ids)
+        return [actions[action_id] for action_id in action_ids if action_id in actions]
+
+    def _get_action_ids(self, position, reverse, limit):
+        key, pull_ids = self._load_state()
+        redis_client = self.service.redis_client
+        bound = f'({position[1]}' if position is not None else None
+
+        if reverse:
+            pushed = redis_client.zrangebyscore(key, bound or '-inf', '+inf', start=0, num=limit)
+        else:
+            pushed = redis_client.zrevrangebyscore(key, bound or '+inf', '-inf', start=0, num=limit)
+        action_ids = {int(action_id) for action_id in pushed}
+
+        if pull_ids:
+            pulled = Action.objects.filter(user_id__in=pull_ids)
+            if position is not None:
+                pulled = pulled.filter(**{'id__gt' if reverse else 'id__lt': position[1]})
+            action_ids.update(
+                pulled.order_by('id' if reverse else '-id')
+                .values_list('id', flat=True)[:limit]
+            )
+
+        return sorted(action_ids, reverse=not reverse)[:limit]
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from actions.archive import ActionArchiveService
+
+
+class Command(BaseCommand):
+    help = "Move actions older than the retention window out of the hot table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Archive actions older than this many days (default: ACTION_RETENTION_DAYS).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Actions moved per transaction (default: ACTION_ARCHIVE_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--file",
+            dest="path",
+            help="Append archived actions to this gzipped JSONL file instead of the archive table.",
+        )
+        parser.add_argument(
+            "--no-rollups",
+            action="store_false",
+            dest="rollups",
+            help="Do not keep per-day counts per verb and user.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches.",
+        )
+        parser.add_argument(
+            "--loop",
+            type=int,
+            metavar="SECONDS",
+            help="Keep running and archive every SECONDS seconds.",
+        )
+
+    def handle(self, *args, **options):
+        archive_service = ActionArchiveService(
+            days=options["days"],
+            batch_size=options["batch_size"],
+            path=options["path"],
+            rollups=options["rollups"],
+            pause=options["pause"],
+        )
+
+        while True:
+            total = archive_service.run()
+            self.stdout.write(self.style.SUCCESS(
+                f"Archived {total} action(s) older than {archive_service.days} day(s)."
+            ))
+            if not options["loop"]:
+                return
+            time.sleep(options["loop"])
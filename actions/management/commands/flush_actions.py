@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from actions.sink import RedisActionSink
+
+
+class Command(BaseCommand):
+    help = "Insert actions buffered in Redis into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and flush every ACTION_SINK_FLUSH_INTERVAL seconds.",
+        )
+
+    def handle(self, *args, **options):
+        sink = RedisActionSink(
+            batch_size=settings.ACTION_SINK_BATCH_SIZE,
+            flush_interval=settings.ACTION_SINK_FLUSH_INTERVAL,
+            start_worker=False,
+        )
+
+        if not options["loop"]:
+            total = sink.flush()
+            self.stdout.write(self.style.SUCCESS(f"Flushed {total} action(s)."))
+            return
+
+        try:
+            while True:
+                total = sink.flush()
+                if total:
+                    self.stdout.write(f"Flushed {total} action(s).")
+                time.sleep(sink.flush_interval)
+        except KeyboardInterrupt:
+            total = sink.flush()
+            self.stdout.write(self.style.SUCCESS(f"Flushed {total} action(s) before exiting."))
@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from actions.feed import FeedService
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Backfill or rebuild the materialized activity feeds in Redis."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="usernames",
+            default=[],
+            help="Only rebuild the feed of this user (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        feed_service = FeedService()
+        pull_authors = feed_service.refresh_pull_authors()
+
+        users = User.objects.filter(is_active=True)
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+
+        total_users = 0
+        total_actions = 0
+        for user_id in users.values_list("id", flat=True).iterator():
+            total_actions += feed_service.rebuild(user_id, pull_authors=pull_authors)
+            total_users += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {total_users} feed(s) with {total_actions} action(s); "
+            f"{len(pull_authors)} author(s) served on read."
+        ))
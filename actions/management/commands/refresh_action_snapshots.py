@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from actions.models import Action
+from actions.snapshots import ActionSnapshotService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized snapshots the activity feed renders from."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild every snapshot instead of only the ones marked stale.",
+        )
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Only build snapshots for actions that have none yet.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+        )
+
+    def handle(self, *args, **options):
+        if options["all"] or options["missing"]:
+            actions = Action.objects.all()
+            if options["missing"]:
+                actions = actions.filter(snapshot={})
+            total = ActionSnapshotService.refresh(actions, batch_size=options["batch_size"])
+        else:
+            total = ActionSnapshotService.refresh_stale()
+
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {total} action snapshot(s)."))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("actions", "0002_action_actions_act_user_id_5d614b_idx"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="action",
+            name="created",
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
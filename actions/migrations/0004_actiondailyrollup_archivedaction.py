@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("actions", "0003_alter_action_created"),
+        ("contenttypes", "0002_remove_content_type_name"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ActionDailyRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField()),
+                ("verb", models.CharField(max_length=256)),
+                ("total", models.PositiveIntegerField(default=0)),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="action_rollups", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "ordering": ["-day"],
+                "constraints": [models.UniqueConstraint(fields=("day", "user", "verb"), name="unique_action_rollup")],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedAction",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("verb", models.CharField(max_length=256)),
+                ("created", models.DateTimeField()),
+                ("target_id", models.PositiveIntegerField(blank=True, null=True)),
+                ("archived", models.DateTimeField(auto_now_add=True)),
+                ("target_ct", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name="+", to="contenttypes.contenttype")),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="archived_actions", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "ordering": ["-created"],
+                "indexes": [models.Index(fields=["user", "-created"], name="actions_arc_user_id_064d6b_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("actions", "0004_actiondailyrollup_archivedaction"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="action",
+            name="snapshot",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
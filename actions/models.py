@@ -2,9 +2,49 @@ from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.db.models.query import ModelIterable
+from django.utils import timezone
+
+from .targets import hydrate_targets
 
 
 class ActionQuerySet(models.QuerySet):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._hydrate_targets = False
+        self._skip_snapshotted = False
+        self._cached_targets = True
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._hydrate_targets = self._hydrate_targets
+        clone._skip_snapshotted = self._skip_snapshotted
+        clone._cached_targets = self._cached_targets
+        return clone
+
+    def _fetch_all(self):
+        needs_hydration = (
+            self._result_cache is None
+            and self._hydrate_targets
+            and self._iterable_class is ModelIterable
+        )
+        super()._fetch_all()
+        if needs_hydration:
+            hydrate_targets(self._result_cache, self._skip_snapshotted, self._cached_targets)
+
+    def with_targets(self, skip_snapshotted=False, cached=True):
+        """
+        Resolve targets and actors of the fetched actions in bulk. Pages that
+        render actions from their snapshot pass `skip_snapshotted` to only
+        resolve actions that have none yet; `cached=False` skips the
+        per-process target cache, for callers that need current targets.
+        """
+        clone = self._chain()
+        clone._hydrate_targets = True
+        clone._skip_snapshotted = skip_snapshotted
+        clone._cached_targets = cached
+        return clone
+
     def for_user(self, user):
         return self.filter(user=user)
     
@@ -29,6 +69,9 @@ class ActionManager(models.Manager):
     def with_target_type(self, model_class):
         return self.get_queryset().with_target_type(model_class)
 
+    def with_targets(self, skip_snapshotted=False, cached=True):
+        return self.get_queryset().with_targets(skip_snapshotted, cached)
+
 
 class Action(models.Model):
     user = models.ForeignKey(
@@ -37,7 +80,7 @@ class Action(models.Model):
         on_delete=models.CASCADE
     )
     verb = models.CharField(max_length=256)
-    created = models.DateTimeField(auto_now_add=True)
+    created = models.DateTimeField(default=timezone.now, editable=False)
     target_ct = models.ForeignKey(
         ContentType,
         blank=True,
@@ -47,6 +90,7 @@ class Action(models.Model):
     )
     target_id = models.PositiveIntegerField(null=True, blank=True)
     target = GenericForeignKey("target_ct", "target_id")
+    snapshot = models.JSONField(default=dict, blank=True)
 
     objects = ActionManager()
 
@@ -60,3 +104,56 @@ class Action(models.Model):
 
     def __str__(self):
         return f'{self.user} {self.verb} {self.target or ""}'
+
+
+class ArchivedAction(models.Model):
+    """Actions moved out of the hot table by the archive_actions command."""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="archived_actions",
+        on_delete=models.CASCADE
+    )
+    verb = models.CharField(max_length=256)
+    created = models.DateTimeField()
+    target_ct = models.ForeignKey(
+        ContentType,
+        blank=True,
+        null=True,
+        related_name="+",
+        on_delete=models.CASCADE
+    )
+    target_id = models.PositiveIntegerField(null=True, blank=True)
+    archived = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created"]),
+        ]
+        ordering = ["-created"]
+
+    def __str__(self):
+        return f'{self.user} {self.verb}'
+
+
+class ActionDailyRollup(models.Model):
+    day = models.DateField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="action_rollups",
+        on_delete=models.CASCADE
+    )
+    verb = models.CharField(max_length=256)
+    total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "user", "verb"],
+                name="unique_action_rollup"
+            ),
+        ]
+        ordering = ["-day"]
+
+    def __str__(self):
+        return f'{self.day} {self.user} {self.verb}: {self.total}'
@@ -0,0 +1,242 @@
+import atexit
+import json
+import logging
+import threading
+from collections import deque
+
+import redis
+from django.conf import settings
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.utils.dateparse import parse_datetime
+
+from bookmarks.redis_client import get_redis_client
+from .feed import FeedService
+from .models import Action
+
+logger = logging.getLogger(__name__)
+
+# Errors that retrying a row can never fix: the database rejects it or the
+# queued payload cannot be decoded.
+UNSTORABLE_ERRORS = (IntegrityError, DataError, ValueError, TypeError, KeyError)
+
+
+class SyncActionSink:
+    """Writes every action immediately, inside the caller's transaction."""
+
+    def write(self, action):
+        action.save()
+        transaction.on_commit(lambda: FeedService().fan_out(action))
+
+    def flush(self):
+        return 0
+
+
+class BufferedActionSink:
+    """
+    Queues actions in process and inserts them with bulk_create, either when
+    `batch_size` actions are pending or every `flush_interval` seconds.
+    Actions are only queued once the caller's transaction commits, and the
+    queue is flushed on interpreter shutdown.
+    """
+
+    def __init__(self, batch_size, flush_interval, start_worker=True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._worker = None
+        if start_worker:
+            self._start_worker()
+        atexit.register(self.close)
+
+    def write(self, action):
+        transaction.on_commit(lambda: self._enqueue(action))
+
+    def flush(self):
+        total = 0
+        while True:
+            batch = self._take(self.batch_size)
+            if not batch:
+                return total
+            try:
+                self._insert(batch)
+            except UNSTORABLE_ERRORS:
+                # One bad row (e.g. its user was deleted meanwhile) must not
+                # block the queue: store the others and drop it.
+                total += self._insert_each(batch)
+                continue
+            except Exception:
+                self._requeue(batch)
+                raise
+            total += len(batch)
+
+    def close(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._worker is not None and self._worker is not threading.current_thread():
+            self._worker.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def pending(self):
+        return len(self._queue)
+
+    def _enqueue(self, action):
+        with self._lock:
+            self._queue.append(action)
+            size = len(self._queue)
+        if size >= self.batch_size:
+            self._wakeup.set()
+
+    def _take(self, count):
+        with self._lock:
+            return [self._queue.popleft() for _ in range(min(count, len(self._queue)))]
+
+    def _requeue(self, actions):
+        with self._lock:
+            self._queue.extendleft(reversed(actions))
+
+    def _to_action(self, item):
+        return item
+
+    def _insert(self, items):
+        actions = [self._to_action(item) for item in items]
+        with transaction.atomic():
+            Action.objects.bulk_create(actions)
+        self._fan_out(actions)
+
+    def _insert_each(self, items):
+        """
+        Insert a rejected batch row by row, logging and dropping rows that
+        cannot be stored. Rows not reached when another error is raised are
+        requeued.
+        """
+        inserted = []
+        try:
+            for position, item in enumerate(items):
+                try:
+                    action = self._to_action(item)
+                    with transaction.atomic():
+                        action.save()
+                except UNSTORABLE_ERRORS:
+                    if isinstance(item, Action):
+                        # Not the Action itself: its __str__ loads the user,
+                        # which may be the row that no longer exists.
+                        logger.exception(
+                            'Dropping action that cannot be stored: user_id=%s verb=%r target_ct_id=%s target_id=%s',
+                            item.user_id, item.verb, item.target_ct_id, item.target_id
+                        )
+                    else:
+                        logger.exception('Dropping action that cannot be stored: %r', item)
+                    continue
+                inserted.append(action)
+        except Exception:
+            self._requeue(items[position:])
+            raise
+        finally:
+            self._fan_out(inserted)
+        return len(inserted)
+
+    def _fan_out(self, actions):
+        feed_service = FeedService()
+        for action in actions:
+            if action.pk:
+                feed_service.fan_out(action)
+
+    def _start_worker(self):
+        self._worker = threading.Thread(
+            target=self._run, name='action-sink', daemon=True
+        )
+        self._worker.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Could not flush buffered actions')
+            finally:
+                close_old_connections()
+
+
+class RedisActionSink(BufferedActionSink):
+    """
+    Buffers actions in a Redis list so they survive process restarts and can
+    be flushed by any process, including the `flush_actions` command.
+    """
+    QUEUE_KEY = 'actions:pending'
+
+    def __init__(self, batch_size, flush_interval, start_worker=True):
+        self.redis_client = get_redis_client()
+        super().__init__(batch_size, flush_interval, start_worker)
+
+    def write(self, action):
+        payload = json.dumps({
+            'user_id': action.user_id,
+            'verb': action.verb,
+            'target_ct_id': action.target_ct_id,
+            'target_id': action.target_id,
+            'created': action.created.isoformat(),
+            'snapshot': action.snapshot,
+        })
+        transaction.on_commit(lambda: self._enqueue(action, payload))
+
+    def pending(self):
+        return self.redis_client.llen(self.QUEUE_KEY)
+
+    def _enqueue(self, action, payload):
+        try:
+            size = self.redis_client.rpush(self.QUEUE_KEY, payload)
+        except redis.RedisError:
+            logger.exception('Could not queue action, writing it directly')
+            self._insert([action])
+            return
+        if size >= self.batch_size:
+            self._wakeup.set()
+
+    def _take(self, count):
+        pipe = self.redis_client.pipeline()
+        pipe.lrange(self.QUEUE_KEY, 0, count - 1)
+        pipe.ltrim(self.QUEUE_KEY, count, -1)
+        payloads, _ = pipe.execute()
+        return payloads
+
+    def _requeue(self, payloads):
+        self.redis_client.lpush(self.QUEUE_KEY, *reversed(payloads))
+
+    def _to_action(self, payload):
+        if isinstance(payload, Action):
+            return payload
+        data = json.loads(payload)
+        data['created'] = parse_datetime(data['created'])
+        return Action(**data)
+
+
+SINK_BACKENDS = {
+    'sync': SyncActionSink,
+    'memory': BufferedActionSink,
+    'redis': RedisActionSink,
+}
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_action_sink():
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                backend = SINK_BACKENDS[settings.ACTION_SINK_BACKEND]
+                if backend is SyncActionSink:
+                    _sink = backend()
+                else:
+                    _sink = backend(
+                        batch_size=settings.ACTION_SINK_BATCH_SIZE,
+                        flush_interval=settings.ACTION_SINK_FLUSH_INTERVAL,
+                        start_worker=settings.ACTION_SINK_WORKER,
+                    )
+    return _sink
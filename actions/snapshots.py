@@ -0,0 +1,120 @@
+import logging
+
+import redis
+from django.contrib.contenttypes.models import ContentType
+
+from bookmarks.redis_client import get_redis_client
+from bookmarks.thumbnails import ThumbnailService
+from .models import Action
+
+logger = logging.getLogger(__name__)
+
+
+class ActionSnapshotService:
+    """
+    Builds the denormalized `Action.snapshot` the feed template renders from,
+    so a feed page needs no joins on the actor, profile or target.
+
+    Sources that change (a profile photo, an image title) are recorded as
+    stale in Redis and picked up in bulk by `refresh_action_snapshots`.
+    """
+    THUMBNAIL_ALIAS = 'action'
+    STALE_USERS_KEY = 'action:snapshot:stale_users'
+    STALE_TARGETS_KEY = 'action:snapshot:stale_targets'
+
+    @classmethod
+    def build(cls, action):
+        user = action.user
+        profile = getattr(user, 'profile', None)
+        snapshot = {
+            'actor_name': user.username,
+            'actor_full_name': user.get_full_name(),
+            'actor_url': str(user.get_absolute_url()),
+            'actor_thumb': cls.thumbnail_url(profile.photo) if profile else '',
+        }
+
+        target = action.target
+        if target is not None:
+            snapshot.update({
+                'target_title': str(target),
+                'target_url': str(target.get_absolute_url()) if hasattr(target, 'get_absolute_url') else '',
+                'target_thumb': cls.thumbnail_url(getattr(target, 'image', None)),
+            })
+        return snapshot
+
+    @classmethod
+    def thumbnail_url(cls, image_file):
+        return ThumbnailService.resolve_urls([image_file], cls.THUMBNAIL_ALIAS)[0]
+
+    @classmethod
+    def attach_thumbnails(cls, actions):
+        """
+        Set `actor_thumb` and `target_thumb` on actions without a snapshot,
+        resolving all thumbnail URLs in one batch per field.
+        """
+        actions = [action for action in actions if not action.snapshot]
+        photos = [getattr(action.user, 'profile', None) for action in actions]
+        photo_urls = ThumbnailService.resolve_urls(
+            [profile.photo if profile else None for profile in photos], cls.THUMBNAIL_ALIAS
+        )
+        image_urls = ThumbnailService.resolve_urls(
+            [getattr(action.target, 'image', None) for action in actions], cls.THUMBNAIL_ALIAS
+        )
+        for action, photo_url, image_url in zip(actions, photo_urls, image_urls):
+            action.actor_thumb = photo_url
+            action.target_thumb = image_url
+        return actions
+
+    @classmethod
+    def refresh(cls, queryset, batch_size=500):
+        total = 0
+        # Snapshots are rebuilt because their sources changed, so the cached
+        # targets may be out of date or already deleted.
+        queryset = queryset.select_related('user', 'user__profile').with_targets(cached=False).order_by('id')
+        last_id = 0
+        while True:
+            actions = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not actions:
+                return total
+            for action in actions:
+                action.snapshot = cls.build(action)
+            Action.objects.bulk_update(actions, ['snapshot'])
+            total += len(actions)
+            last_id = actions[-1].id
+
+    @classmethod
+    def mark_user_stale(cls, user):
+        cls._mark_stale(cls.STALE_USERS_KEY, str(user.id))
+
+    @classmethod
+    def mark_target_stale(cls, target):
+        target_ct = ContentType.objects.get_for_model(target)
+        cls._mark_stale(cls.STALE_TARGETS_KEY, f'{target_ct.id}:{target.id}')
+
+    @classmethod
+    def refresh_stale(cls):
+        redis_client = get_redis_client()
+        pipe = redis_client.pipeline()
+        pipe.smembers(cls.STALE_USERS_KEY)
+        pipe.smembers(cls.STALE_TARGETS_KEY)
+        pipe.delete(cls.STALE_USERS_KEY, cls.STALE_TARGETS_KEY)
+        stale_users, stale_targets, _ = pipe.execute()
+
+        total = 0
+        if stale_users:
+            total += cls.refresh(
+                Action.objects.filter(user_id__in=[int(user_id) for user_id in stale_users])
+            )
+        for stale_target in stale_targets:
+            target_ct_id, target_id = stale_target.decode().split(':')
+            total += cls.refresh(
+                Action.objects.filter(target_ct_id=target_ct_id, target_id=target_id)
+            )
+        return total
+
+    @classmethod
+    def _mark_stale(cls, key, member):
+        try:
+            get_redis_client().sadd(key, member)
+        except redis.RedisError:
+            logger.exception('Could not mark action snapshots stale for %s', member)
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import prefetch_related_objects
+
+
+class TargetCache:
+    """
+    Small per-process cache of recently resolved action targets, keyed by
+    (content type id, object id). Entries expire after `ttl` seconds and the
+    oldest entries are evicted once `max_size` is reached.
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires, obj = entry
+                if expires < now:
+                    del self._entries[key]
+                else:
+                    found[key] = obj
+        return found
+
+    def set_many(self, objects):
+        if not self.ttl:
+            return
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for key, obj in objects.items():
+                self._entries.pop(key, None)
+                self._entries[key] = (expires, obj)
+            while len(self._entries) > self.max_size:
+                del self._entries[next(iter(self._entries))]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class TargetResolver:
+    """
+    Resolves the generic `target` of many actions at once: one `id__in`
+    query per target content type, with the relations the feed templates
+    touch pulled in through `select_related`.
+    """
+    SELECT_RELATED = {
+        'auth.user': ('profile',),
+    }
+
+    def __init__(self, cache=None):
+        self.cache = cache
+
+    def resolve(self, actions):
+        ids_by_ct = defaultdict(set)
+        for action in actions:
+            if action.target_ct_id and action.target_id:
+                ids_by_ct[action.target_ct_id].add(action.target_id)
+        if not ids_by_ct:
+            return actions
+
+        keys = [(ct_id, pk) for ct_id, pks in ids_by_ct.items() for pk in pks]
+        targets = self.cache.get_many(keys) if self.cache else {}
+
+        fetched = {}
+        for ct_id, pks in ids_by_ct.items():
+            missing = [pk for pk in pks if (ct_id, pk) not in targets]
+            if not missing:
+                continue
+            model = ContentType.objects.get_for_id(ct_id).model_class()
+            if model is None:
+                continue
+            queryset = model._default_manager.filter(pk__in=missing)
+            select_related = self.SELECT_RELATED.get(model._meta.label_lower)
+            if select_related:
+                queryset = queryset.select_related(*select_related)
+            for obj in queryset:
+                fetched[(ct_id, obj.pk)] = obj
+
+        if fetched and self.cache:
+            self.cache.set_many(fetched)
+        targets.update(fetched)
+
+        target_field = type(actions[0]).target
+        for action in actions:
+            if action.target_ct_id and action.target_id:
+                target_field.set_cached_value(
+                    action, targets.get((action.target_ct_id, action.target_id))
+                )
+        return actions
+
+
+target_cache = TargetCache(
+    ttl=settings.ACTION_TARGET_CACHE_TTL,
+    max_size=settings.ACTION_TARGET_CACHE_SIZE,
+)
+
+
+def hydrate_targets(actions, skip_snapshotted=False, cached=True):
+    """
+    Resolve targets and actors of `actions` in bulk. With `skip_snapshotted`,
+    actions that already have a snapshot are left alone, since templates
+    render those without touching either. `cached=False` bypasses
+    `target_cache`.
+    """
+    if skip_snapshotted:
+        actions = [action for action in actions if not action.snapshot]
+    if actions:
+        TargetResolver(target_cache if cached else None).resolve(actions)
+        user_field = type(actions[0]).user.field
+        prefetch_related_objects(
+            [action for action in actions if not user_field.is_cached(action)],
+            'user__profile'
+        )
@@ -1,11 +1,20 @@
 import datetime
+import logging
+
+import redis
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
+from bookmarks.redis_client import get_redis_client
 from .models import Action
+from .sink import get_action_sink
+from .snapshots import ActionSnapshotService
+
+logger = logging.getLogger(__name__)
 
 
 class ActionService:
     DUPLICATE_THRESHOLD_SECONDS = 60
+    DUPLICATE_KEY = 'action:dedup:{user_id}:{verb}:{target_ct_id}:{target_id}'
     
     @classmethod
     def create_action(cls, user, verb, target=None):
@@ -13,11 +22,29 @@ class ActionService:
             return False
         
         action = Action(user=user, verb=verb, target=target)
-        action.save()
+        action.snapshot = ActionSnapshotService.build(action)
+        get_action_sink().write(action)
         return True
     
     @classmethod
     def _is_duplicate_action(cls, user, verb, target):
+        target_ct_id = ContentType.objects.get_for_model(target).id if target else None
+        key = cls.DUPLICATE_KEY.format(
+            user_id=user.id,
+            verb=verb,
+            target_ct_id=target_ct_id or '',
+            target_id=target.id if target else ''
+        )
+        redis_client = get_redis_client()
+
+        try:
+            return not redis_client.set(key, 1, nx=True, ex=cls.DUPLICATE_THRESHOLD_SECONDS)
+        except redis.RedisError:
+            logger.warning('Redis unavailable, checking duplicate action in the database')
+            return cls._is_duplicate_action_in_db(user, verb, target)
+
+    @classmethod
+    def _is_duplicate_action_in_db(cls, user, verb, target):
         threshold_time = timezone.now() - datetime.timedelta(
             seconds=cls.DUPLICATE_THRESHOLD_SECONDS
         )
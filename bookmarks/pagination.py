@@ -0,0 +1,155 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def keyset_slice(queryset, field, position, reverse, limit):
+    """
+    Return up to `limit` rows of `queryset` strictly after `position`
+    (a `(value, id)` pair) in `-field, -id` order, or strictly before it in
+    `field, id` order when `reverse` is set.
+    """
+    keys = [field, 'id'] if field != 'id' else ['id']
+    if position is not None:
+        value, pk = position
+        lookup = 'gt' if reverse else 'lt'
+        if field == 'id':
+            queryset = queryset.filter(**{f'id__{lookup}': pk})
+        else:
+            queryset = queryset.filter(
+                Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'id__{lookup}': pk})
+            )
+    if reverse:
+        queryset = queryset.order_by(*keys)
+    else:
+        queryset = queryset.order_by(*[f'-{key}' for key in keys])
+    return list(queryset[:limit])
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset paginator over `(field, id)`, newest first.
+
+    Pages are addressed by opaque cursors instead of page numbers, so no
+    COUNT(*) or OFFSET is ever issued. `object_list` is either a queryset or
+    an object exposing `seek(position, reverse, limit)` with the same
+    contract as `keyset_slice`.
+    """
+
+    def __init__(self, object_list, per_page, field='created'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.field = field
+
+    def page(self, cursor=None):
+        try:
+            position, reverse = self.decode_cursor(cursor)
+        except ValueError:
+            position, reverse = None, False
+
+        items = self._seek(position, reverse, self.per_page + 1)
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+
+        if reverse:
+            items.reverse()
+            next_cursor = self.encode_cursor(self._position(items[-1])) if items else None
+            previous_cursor = self.encode_cursor(self._position(items[0]), reverse=True) if has_more else None
+        else:
+            next_cursor = self.encode_cursor(self._position(items[-1])) if has_more else None
+            previous_cursor = None
+            if position is not None:
+                start = self._position(items[0]) if items else position
+                previous_cursor = self.encode_cursor(start, reverse=True)
+
+        return CursorPage(items, next_cursor, previous_cursor)
+
+    def encode_cursor(self, position, reverse=False):
+        value, pk = position
+        payload = json.dumps({'v': self.encode_value(value), 'id': pk, 'r': int(reverse)})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None, False
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            position = (self.decode_value(payload['v']), int(payload['id']))
+            return position, bool(payload.get('r'))
+        except (binascii.Error, TypeError, KeyError, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid cursor: {e}")
+
+    def encode_value(self, value):
+        return value.isoformat()
+
+    def decode_value(self, value):
+        return datetime.fromisoformat(value)
+
+    def _position(self, obj):
+        return getattr(obj, self.field), obj.id
+
+    def _seek(self, position, reverse, limit):
+        seek = getattr(self.object_list, 'seek', None)
+        if seek is not None:
+            return list(seek(position, reverse, limit))
+        return keyset_slice(self.object_list, self.field, position, reverse, limit)
+
+
+class IdCursorPaginator(CursorPaginator):
+    """
+    Cursor paginator over the primary key alone, for tables where id order
+    is creation order and the only index to page along is the primary key.
+    """
+
+    def __init__(self, object_list, per_page, field='id'):
+        super().__init__(object_list, per_page, field)
+
+    def encode_value(self, value):
+        return value
+
+    def decode_value(self, value):
+        return int(value)
+
+
+class CursorPaginationMixin:
+    """
+    Drop-in replacement for ListView's page-number pagination. The page is
+    selected by the `cursor` GET parameter.
+    """
+    cursor_field = 'created'
+    cursor_kwarg = 'cursor'
+    paginator_class = CursorPaginator
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.paginator_class(queryset, page_size, field=self.cursor_field)
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        return paginator, page, page.object_list, page.has_other_pages()
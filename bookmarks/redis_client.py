@@ -0,0 +1,60 @@
+import threading
+
+import redis
+from django.conf import settings
+
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_connection_kwargs(db=None):
+    kwargs = {
+        'db': settings.REDIS_DB if db is None else db,
+        'socket_timeout': settings.REDIS_SOCKET_TIMEOUT,
+        'socket_connect_timeout': settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        'health_check_interval': settings.REDIS_HEALTH_CHECK_INTERVAL,
+    }
+    if settings.REDIS_UNIX_SOCKET_PATH:
+        kwargs['path'] = settings.REDIS_UNIX_SOCKET_PATH
+        kwargs['connection_class'] = redis.UnixDomainSocketConnection
+    else:
+        kwargs['host'] = settings.REDIS_HOST
+        kwargs['port'] = settings.REDIS_PORT
+    return kwargs
+
+
+def get_redis_client(db=None):
+    """
+    Return the process-wide Redis client for `db` (REDIS_DB by default).
+
+    Clients are created once per process on a shared ConnectionPool capped at
+    REDIS_MAX_CONNECTIONS, so callers can ask for one on every request
+    without opening new sockets. redis-py resets the pool after a fork.
+    """
+    db = settings.REDIS_DB if db is None else db
+    return _get_client(db, db)
+
+
+def get_blocking_redis_client(db=None):
+    """
+    Like get_redis_client, for blocking commands (BLPOP) only. Its sockets
+    wait up to REDIS_BLOCKING_SOCKET_TIMEOUT, so a poll shorter than that
+    returns empty instead of timing out.
+    """
+    db = settings.REDIS_DB if db is None else db
+    return _get_client(('blocking', db), db, socket_timeout=settings.REDIS_BLOCKING_SOCKET_TIMEOUT)
+
+
+def _get_client(key, db, **overrides):
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                pool = redis.ConnectionPool(
+                    max_connections=settings.REDIS_MAX_CONNECTIONS,
+                    **{**get_connection_kwargs(db), **overrides}
+                )
+                client = _clients[key] = redis.Redis(connection_pool=pool)
+    return client
@@ -139,11 +139,97 @@ INTERNAL_IPS = ['127.0.0.1']
 REDIS_HOST = config('REDIS_HOST', default='localhost')
 REDIS_PORT = config('REDIS_PORT', default=6379, cast=int)
 REDIS_DB = config('REDIS_DB', default=0, cast=int)
+REDIS_UNIX_SOCKET_PATH = config('REDIS_UNIX_SOCKET_PATH', default='')
+REDIS_MAX_CONNECTIONS = config('REDIS_MAX_CONNECTIONS', default=50, cast=int)
+REDIS_SOCKET_TIMEOUT = config('REDIS_SOCKET_TIMEOUT', default=2.0, cast=float)
+# Blocking queue polls (BLPOP) must return before this.
+REDIS_BLOCKING_SOCKET_TIMEOUT = config('REDIS_BLOCKING_SOCKET_TIMEOUT', default=30.0, cast=float)
+REDIS_SOCKET_CONNECT_TIMEOUT = config('REDIS_SOCKET_CONNECT_TIMEOUT', default=1.0, cast=float)
+REDIS_HEALTH_CHECK_INTERVAL = config('REDIS_HEALTH_CHECK_INTERVAL', default=30, cast=int)
+
+ACTIVITY_FEED_MAX_LENGTH = config('ACTIVITY_FEED_MAX_LENGTH', default=500, cast=int)
+ACTIVITY_FEED_FANOUT_LIMIT = config('ACTIVITY_FEED_FANOUT_LIMIT', default=1000, cast=int)
+
+ACTION_TARGET_CACHE_TTL = config('ACTION_TARGET_CACHE_TTL', default=30, cast=int)
+ACTION_TARGET_CACHE_SIZE = config('ACTION_TARGET_CACHE_SIZE', default=1000, cast=int)
+
+# 'sync' writes each action in the request; 'memory' and 'redis' buffer them
+# and insert in batches.
+ACTION_SINK_BACKEND = config('ACTION_SINK_BACKEND', default='sync')
+ACTION_SINK_BATCH_SIZE = config('ACTION_SINK_BATCH_SIZE', default=100, cast=int)
+ACTION_SINK_FLUSH_INTERVAL = config('ACTION_SINK_FLUSH_INTERVAL', default=2.0, cast=float)
+ACTION_SINK_WORKER = config('ACTION_SINK_WORKER', default=True, cast=bool)
+
+ACTION_RETENTION_DAYS = config('ACTION_RETENTION_DAYS', default=180, cast=int)
+ACTION_ARCHIVE_BATCH_SIZE = config('ACTION_ARCHIVE_BATCH_SIZE', default=1000, cast=int)
+
+IMAGE_RANKING_REFRESH_SECONDS = config('IMAGE_RANKING_REFRESH_SECONDS', default=300, cast=int)
+
+IMAGE_INGEST_WORKERS = config('IMAGE_INGEST_WORKERS', default=4, cast=int)
+IMAGE_INGEST_MAX_ATTEMPTS = config('IMAGE_INGEST_MAX_ATTEMPTS', default=3, cast=int)
+IMAGE_INGEST_RETRY_DELAY = config('IMAGE_INGEST_RETRY_DELAY', default=30, cast=int)
+# A download still processing after this long is re-queued on the next pool start.
+IMAGE_INGEST_LEASE_SECONDS = config('IMAGE_INGEST_LEASE_SECONDS', default=600, cast=int)
+
+IMAGE_DOWNLOAD_MAX_BYTES = config('IMAGE_DOWNLOAD_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+IMAGE_DOWNLOAD_SPOOL_BYTES = config('IMAGE_DOWNLOAD_SPOOL_BYTES', default=1024 * 1024, cast=int)
+
+BOOKMARK_IMPORT_WORKERS = config('BOOKMARK_IMPORT_WORKERS', default=8, cast=int)
+BOOKMARK_IMPORT_PER_HOST = config('BOOKMARK_IMPORT_PER_HOST', default=2, cast=int)
+BOOKMARK_IMPORT_BATCH_SIZE = config('BOOKMARK_IMPORT_BATCH_SIZE', default=200, cast=int)
+BOOKMARK_IMPORT_MAX_UPLOAD_BYTES = config('BOOKMARK_IMPORT_MAX_UPLOAD_BYTES', default=20 * 1024 * 1024, cast=int)
+
+# Near-duplicates differ in at most this many of the 64 perceptual hash bits.
+SIMILAR_IMAGE_MAX_DISTANCE = config('SIMILAR_IMAGE_MAX_DISTANCE', default=6, cast=int)
+SIMILAR_IMAGE_COUNT = config('SIMILAR_IMAGE_COUNT', default=8, cast=int)
+
+# Co-like recommendations, rebuilt by the build_recommendations command.
+RECOMMENDATION_NEIGHBOURS = config('RECOMMENDATION_NEIGHBOURS', default=20, cast=int)
+RECOMMENDATION_MIN_CO_LIKES = config('RECOMMENDATION_MIN_CO_LIKES', default=2, cast=int)
+RECOMMENDATION_MAX_USER_LIKES = config('RECOMMENDATION_MAX_USER_LIKES', default=500, cast=int)
+RECOMMENDATION_COUNT = config('RECOMMENDATION_COUNT', default=6, cast=int)
+
+# Every thumbnail size the templates use. They are generated when an image or
+# profile photo is saved, in a pool of THUMBNAIL_WORKERS processes (0 renders
+# them inline), and backfilled by `generate_thumbnails`.
+THUMBNAIL_ALIASES = {
+    'images.Image.image': {
+        'list': {'size': (300, 300), 'crop': 'smart'},
+        'detail': {'size': (300, 0)},
+        'ranking': {'size': (80, 80), 'crop': 'smart'},
+        'action': {'size': (80, 80), 'crop': '100%'},
+    },
+    'account.Profile.photo': {
+        'list': {'size': (180, 180)},
+        'detail': {'size': (200, 200), 'crop': 'center'},
+        'action': {'size': (80, 80), 'crop': '100%'},
+    },
+}
+# Aliases that also get WebP/AVIF variants at each scale of their width, for
+# srcset. Formats Pillow cannot write are skipped.
+THUMBNAIL_VARIANTS = {
+    'images.Image.image': ['list', 'detail', 'ranking'],
+}
+THUMBNAIL_VARIANT_FORMATS = ['avif', 'webp']
+THUMBNAIL_VARIANT_SCALES = [0.5, 1, 2]
+THUMBNAIL_WORKERS = config('THUMBNAIL_WORKERS', default=2, cast=int)
+THUMBNAIL_URL_CACHE_TIMEOUT = config('THUMBNAIL_URL_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int)
+
+if REDIS_UNIX_SOCKET_PATH:
+    REDIS_URL = f'unix://{REDIS_UNIX_SOCKET_PATH}?db={REDIS_DB}'
+else:
+    REDIS_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}'
 
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-        'LOCATION': f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}',
+        'LOCATION': REDIS_URL,
+        'OPTIONS': {
+            'max_connections': REDIS_MAX_CONNECTIONS,
+            'socket_timeout': REDIS_SOCKET_TIMEOUT,
+            'socket_connect_timeout': REDIS_SOCKET_CONNECT_TIMEOUT,
+            'health_check_interval': REDIS_HEALTH_CHECK_INTERVAL,
+        },
     }
 }
 
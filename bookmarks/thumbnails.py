@@ -0,0 +1,253 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from easy_thumbnails import namers
+from easy_thumbnails.alias import aliases
+from PIL import features
+
+logger = logging.getLogger(__name__)
+
+
+ORIGINAL = (None, 1)
+AVIF_SUBSAMPLING = '4:2:0'
+
+
+def get_variants(target, alias):
+    """
+    Return the (format, scale) variants rendered for `alias` of `target`
+    ('app_label.Model.field'): the original first, then every format in
+    THUMBNAIL_VARIANT_FORMATS that Pillow can write, at each scale.
+    """
+    variants = [ORIGINAL]
+    if alias in settings.THUMBNAIL_VARIANTS.get(target, ()):
+        formats = [fmt for fmt in settings.THUMBNAIL_VARIANT_FORMATS if features.check(fmt)]
+        variants += [(fmt, scale) for fmt in formats for scale in settings.THUMBNAIL_VARIANT_SCALES]
+    return variants
+
+
+def get_variant_options(options, scale, fmt=None):
+    width, height = options['size']
+    options = dict(options, size=(round(width * scale), round(height * scale)))
+    if fmt:
+        # srcset advertises every variant at its full width, so sources
+        # smaller than that are enlarged rather than left at their own size.
+        options['upscale'] = True
+    if fmt == 'avif':
+        # Pillow's AVIF encoder takes chroma subsampling as a string rather
+        # than easy_thumbnails' JPEG-style integer.
+        options['subsampling'] = AVIF_SUBSAMPLING
+    return options
+
+
+def variant_namer(prepared_options, **kwargs):
+    """easy_thumbnails' default namer, minus the colons of AVIF subsampling."""
+    prepared_options = [option.replace(':', '') for option in prepared_options]
+    return namers.default(prepared_options=prepared_options, **kwargs)
+
+
+def get_variant_thumbnailer(fieldfile, fmt=None):
+    # Imported here because spawned workers load this module before
+    # django.setup() has run, and easy_thumbnails.files imports models.
+    from easy_thumbnails.files import get_thumbnailer
+
+    thumbnailer = get_thumbnailer(fieldfile)
+    if fmt:
+        thumbnailer.thumbnail_extension = fmt
+        thumbnailer.thumbnail_transparency_extension = fmt
+        thumbnailer.thumbnail_preserve_extensions = ()
+        thumbnailer.thumbnail_namer = variant_namer
+    return thumbnailer
+
+
+def generate_aliases(model_label, field_name, name):
+    """
+    Render every THUMBNAIL_ALIASES entry, with its format variants, for the
+    file `name` stored in `model_label`.`field_name`. Thumbnails that
+    already exist are skipped. Returns the number of thumbnails checked.
+    """
+    model = apps.get_model(model_label)
+    field = model._meta.get_field(field_name)
+    fieldfile = field.attr_class(model(), field, name)
+    target = f'{model_label}.{field_name}'
+
+    total = 0
+    for alias, options in aliases.all(fieldfile, include_global=False).items():
+        for fmt, scale in get_variants(target, alias):
+            thumbnailer = get_variant_thumbnailer(fieldfile, fmt)
+            thumbnailer.get_thumbnail(dict(get_variant_options(options, scale, fmt), ALIAS=alias))
+            total += 1
+    return total
+
+
+def _setup_worker():
+    django.setup()
+
+
+class ThumbnailService:
+    """
+    Pre-renders thumbnail aliases outside the request, so templates only look
+    up existing files. Jobs run in a process pool shared by the whole process
+    and created on first use; PIL work does not release the GIL, so threads
+    would not help here.
+    """
+    URL_CACHE_KEY = 'thumbnail_url:{alias}:{variant}:{name}'
+
+    _executor = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def resolve_urls(cls, files, alias):
+        """
+        Return the `alias` thumbnail URL of every file in `files` (FieldFiles
+        of one model field), in order, with '' for empty files.
+        """
+        urls = cls._resolve(files, alias, [ORIGINAL])
+        return [urls.get((fieldfile.name, ORIGINAL), '') if fieldfile else '' for fieldfile in files]
+
+    @classmethod
+    def resolve_pictures(cls, files, alias):
+        """
+        Like `resolve_urls`, but return for every file a dict with the
+        original thumbnail as `src` plus one `sources` entry per modern
+        format holding a width-described `srcset`, or None for empty files.
+        Variants that have not been generated yet are left out.
+        """
+        fieldfiles = [fieldfile for fieldfile in files if fieldfile]
+        if not fieldfiles:
+            return [None] * len(files)
+
+        target = '{}.{}'.format(fieldfiles[0].instance._meta.label, fieldfiles[0].field.name)
+        width = aliases.get(alias, target=target)['size'][0]
+        variants = get_variants(target, alias) if width else [ORIGINAL]
+        urls = cls._resolve(fieldfiles, alias, variants)
+
+        pictures = []
+        for fieldfile in files:
+            if not fieldfile:
+                pictures.append(None)
+                continue
+            sources = {}
+            for fmt, scale in variants[1:]:
+                url = urls.get((fieldfile.name, (fmt, scale)))
+                if url:
+                    sources.setdefault(fmt, []).append(f'{url} {round(width * scale)}w')
+            pictures.append({
+                'src': urls.get((fieldfile.name, ORIGINAL), ''),
+                'width': width,
+                'sources': [
+                    {'type': f'image/{fmt}', 'srcset': ', '.join(srcset)}
+                    for fmt, srcset in sources.items()
+                ],
+            })
+        return pictures
+
+    @classmethod
+    def _resolve(cls, files, alias, variants):
+        """
+        Map (file name, variant) to a thumbnail URL for every file and
+        variant, using one cache get_many and a single query on
+        easy_thumbnails' Thumbnail table for the misses. Originals that were
+        never generated are rendered here; format variants are left to the
+        workers and `generate_thumbnails`.
+        """
+        from easy_thumbnails.models import Thumbnail
+        from easy_thumbnails.utils import get_storage_hash
+
+        fieldfiles = {fieldfile.name: fieldfile for fieldfile in files if fieldfile}
+        keys = {
+            (name, variant): cls.URL_CACHE_KEY.format(
+                alias=alias, variant=cls._variant_key(variant), name=name
+            )
+            for name in fieldfiles for variant in variants
+        }
+        cached = cache.get_many(keys.values())
+        urls = {item: cached[key] for item, key in keys.items() if key in cached}
+
+        thumbnailers = {
+            (name, variant): get_variant_thumbnailer(fieldfiles[name], variant[0])
+            for name, variant in keys if (name, variant) not in urls
+        }
+        if not thumbnailers:
+            return urls
+
+        candidates = {}
+        for (name, variant), thumbnailer in thumbnailers.items():
+            options = aliases.get(alias, target=thumbnailer.alias_target)
+            options = get_variant_options(options, variant[1], variant[0])
+            # Sources with transparency get a different thumbnail extension.
+            for transparent in (False, True):
+                candidates[thumbnailer.get_thumbnail_name(options, transparent)] = (name, variant)
+
+        storage = next(iter(thumbnailers.values())).thumbnail_storage
+        existing = Thumbnail.objects.filter(
+            storage_hash=get_storage_hash(storage), name__in=candidates
+        ).values_list('name', flat=True)
+        found = {candidates[thumbnail_name]: storage.url(thumbnail_name) for thumbnail_name in existing}
+
+        for (name, variant), thumbnailer in thumbnailers.items():
+            if variant == ORIGINAL and (name, variant) not in found:
+                try:
+                    found[name, variant] = thumbnailer[alias].url
+                except Exception:
+                    logger.exception('Could not render thumbnail for %s', name)
+        cache.set_many(
+            {keys[item]: url for item, url in found.items()},
+            settings.THUMBNAIL_URL_CACHE_TIMEOUT
+        )
+        urls.update(found)
+        return urls
+
+    @staticmethod
+    def _variant_key(variant):
+        fmt, scale = variant
+        return f'{fmt}@{scale}' if fmt else 'original'
+
+    @classmethod
+    def generate_later(cls, fieldfile):
+        if not fieldfile:
+            return
+        job = (fieldfile.instance._meta.label, fieldfile.field.name, fieldfile.name)
+        transaction.on_commit(lambda: cls.submit(*job))
+
+    @classmethod
+    def submit(cls, model_label, field_name, name):
+        if not settings.THUMBNAIL_WORKERS:
+            try:
+                generate_aliases(model_label, field_name, name)
+            except Exception:
+                logger.exception('Could not generate thumbnails for %s', name)
+            return None
+
+        future = cls.get_executor().submit(generate_aliases, model_label, field_name, name)
+        future.add_done_callback(lambda f: cls._log_failure(f, name))
+        return future
+
+    @classmethod
+    def get_executor(cls):
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = cls.create_executor(settings.THUMBNAIL_WORKERS)
+        return cls._executor
+
+    @staticmethod
+    def create_executor(workers):
+        # Spawned workers set Django up from scratch instead of inheriting the
+        # parent's database connections and threads through fork().
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_setup_worker,
+        )
+
+    @staticmethod
+    def _log_failure(future, name):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error('Could not generate thumbnails for %s', name, exc_info=future.exception())
@@ -1,16 +1,19 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Image
+from actions.snapshots import ActionSnapshotService
+from .models import BookmarkImport, Image
+from .search import ImageSearchIndex
+from .services import ImageRankingService
 
 
 @admin.register(Image)
 class ImageAdmin(admin.ModelAdmin):
-    list_display = ["title", "user", "total_likes", "image_preview", "created"]
-    list_filter = ["created", "user"]
+    list_display = ["title", "user", "status", "total_likes", "image_preview", "created"]
+    list_filter = ["created", "status", "user"]
     search_fields = ["title", "description"]
     prepopulated_fields = {"slug": ("title",)}
     raw_id_fields = ["user"]
-    readonly_fields = ["total_likes", "created"]
+    readonly_fields = ["total_likes", "views", "created"]
     list_per_page = 10
     
     fieldsets = (
@@ -18,11 +21,22 @@ class ImageAdmin(admin.ModelAdmin):
             'fields': ('title', 'slug', 'user', 'url', 'image', 'description')
         }),
         ('Statistics', {
-            'fields': ('total_likes', 'created'),
+            'fields': ('total_likes', 'views', 'created'),
             'classes': ('collapse',)
         }),
     )
     
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            ActionSnapshotService.mark_target_stale(obj)
+            ImageRankingService.invalidate()
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        return ImageSearchIndex.filter(queryset, search_term), False
+
     def image_preview(self, obj):
         if obj.image:
             return format_html(
@@ -31,4 +45,12 @@ class ImageAdmin(admin.ModelAdmin):
             )
         return "No image"
         
-    image_preview.short_description = "Preview"
\ No newline at end of file
+    image_preview.short_description = "Preview"
+
+
+@admin.register(BookmarkImport)
+class BookmarkImportAdmin(admin.ModelAdmin):
+    list_display = ["id", "user", "format", "status", "rows_processed", "imported", "skipped", "failed", "created"]
+    list_filter = ["status", "format", "created"]
+    raw_id_fields = ["user"]
+    readonly_fields = ["rows_processed", "imported", "skipped", "failed", "errors", "created", "updated"]
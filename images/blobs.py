@@ -0,0 +1,66 @@
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+
+from .models import ImageBlob, ImageSource
+
+
+class ImageBlobStore:
+    """
+    Content-addressed image storage. Identical bytes are stored once under
+    `images/blobs/<aa>/<bb>/<sha256>.<ext>`, so every Image pointing at them
+    also shares one set of thumbnails, and source URLs already downloaded
+    resolve to their blob without another download.
+    """
+    BLOB_PATH = "images/blobs/{prefix}/{sha256}{extension}"
+    CHUNK_SIZE = 64 * 1024
+
+    @classmethod
+    def find_by_url(cls, url):
+        source = (
+            ImageSource.objects.select_related('blob')
+            .filter(url_hash=ImageSource.hash_url(url))
+            .first()
+        )
+        return source.blob if source else None
+
+    @classmethod
+    def store(cls, image_file, url=None, sha256=None):
+        """
+        Store `image_file` (named `<sha256>.<ext>` by ImageDownloadService
+        unless `sha256` is given) and record `url` as one of its sources.
+        """
+        name_root, extension = os.path.splitext(image_file.name)
+        sha256 = sha256 or name_root
+
+        blob = ImageBlob.objects.filter(sha256=sha256).first()
+        if blob is None:
+            path = cls.BLOB_PATH.format(
+                prefix=f"{sha256[:2]}/{sha256[2:4]}", sha256=sha256, extension=extension.lower()
+            )
+            if not default_storage.exists(path):
+                image_file.seek(0)
+                path = default_storage.save(path, image_file)
+            try:
+                with transaction.atomic():
+                    blob = ImageBlob.objects.create(sha256=sha256, file=path, size=image_file.size)
+            except IntegrityError:
+                blob = ImageBlob.objects.get(sha256=sha256)
+
+        if url:
+            ImageSource.objects.get_or_create(
+                url_hash=ImageSource.hash_url(url),
+                defaults={'url': url, 'blob': blob}
+            )
+        return blob
+
+    @classmethod
+    def hash_file(cls, file):
+        digest = hashlib.sha256()
+        file.seek(0)
+        for chunk in iter(lambda: file.read(cls.CHUNK_SIZE), b''):
+            digest.update(chunk)
+        file.seek(0)
+        return digest.hexdigest()
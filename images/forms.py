@@ -1,36 +1,97 @@
+import hashlib
+import tempfile
+import threading
+
 import requests
-from django.core.files.base import ContentFile
-from django.utils.text import slugify
+from django.conf import settings
+from django.core.files import File
 from django import forms
 from PIL import Image as PILImage
-from io import BytesIO
 from .models import Image
 
 
 class ImageDownloadService:
     VALID_EXTENSIONS = ['jpg', 'jpeg', 'png']
+    SIGNATURES = {
+        b'\xff\xd8\xff': 'jpg',
+        b'\x89PNG\r\n\x1a\n': 'png',
+    }
+    SIGNATURE_LENGTH = 8
     REQUEST_TIMEOUT = 30
+    CHUNK_SIZE = 64 * 1024
     HEADERS = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
+    _local = threading.local()
+    
+    @classmethod
+    def get_session(cls):
+        session = getattr(cls._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(cls.HEADERS)
+            cls._local.session = session
+        return session
+    
+    @classmethod
+    def sniff_format(cls, header):
+        for signature, image_format in cls.SIGNATURES.items():
+            if header.startswith(signature):
+                return image_format
+        return None
     
     @classmethod
     def download_and_validate(cls, url):
+        """
+        Stream `url` into a spooled temporary file, rejecting non-images from
+        their first bytes and anything over IMAGE_DOWNLOAD_MAX_BYTES as soon
+        as it is exceeded. Returns a File positioned at the start and named
+        `<sha256>.<extension>`; the caller is responsible for closing it.
+        """
+        max_bytes = settings.IMAGE_DOWNLOAD_MAX_BYTES
+        spool = tempfile.SpooledTemporaryFile(max_size=settings.IMAGE_DOWNLOAD_SPOOL_BYTES)
         try:
-            response = requests.get(url, headers=cls.HEADERS, timeout=cls.REQUEST_TIMEOUT)
-            response.raise_for_status()
-            
-            content_type = response.headers.get('content-type', '')
-            if not content_type.startswith('image/'):
-                raise ValueError(f"URL does not point to an image. Content-Type: {content_type}")
+            with cls.get_session().get(url, timeout=cls.REQUEST_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
+                
+                content_type = response.headers.get('content-type', '')
+                if not content_type.startswith('image/'):
+                    raise ValueError(f"URL does not point to an image. Content-Type: {content_type}")
+                
+                content_length = response.headers.get('content-length', '')
+                if content_length.isdigit() and int(content_length) > max_bytes:
+                    raise ValueError(f"Image is larger than {max_bytes} bytes.")
+                
+                size = 0
+                header = b''
+                digest = hashlib.sha256()
+                for chunk in response.iter_content(cls.CHUNK_SIZE):
+                    if len(header) < cls.SIGNATURE_LENGTH:
+                        header += chunk[:cls.SIGNATURE_LENGTH - len(header)]
+                        if len(header) >= cls.SIGNATURE_LENGTH and not cls.sniff_format(header):
+                            raise ValueError("URL does not point to a JPEG or PNG image.")
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ValueError(f"Image is larger than {max_bytes} bytes.")
+                    digest.update(chunk)
+                    spool.write(chunk)
             
-            pil_image = PILImage.open(BytesIO(response.content))
-            pil_image.verify()
+            extension = cls.sniff_format(header)
+            if not extension:
+                raise ValueError("URL does not point to a JPEG or PNG image.")
             
-            return response.content
+            spool.seek(0)
+            PILImage.open(spool).verify()
+            spool.seek(0)
+            return File(spool, name=f"{digest.hexdigest()}.{extension}")
         except requests.RequestException as e:
+            spool.close()
             raise ValueError(f"Error downloading image: {e}")
+        except ValueError:
+            spool.close()
+            raise
         except Exception as e:
+            spool.close()
             raise ValueError(f"Error processing image: {e}")
     
     @classmethod
@@ -40,12 +101,6 @@ class ImageDownloadService:
             return extension in cls.VALID_EXTENSIONS
         except IndexError:
             return False
-    
-    @classmethod
-    def generate_filename(cls, title, url):
-        name = slugify(title)
-        extension = url.rsplit(".", 1)[1].lower()
-        return f"{name}.{extension}"
 
 
 class ImageCreateForm(forms.ModelForm):
@@ -66,20 +121,21 @@ class ImageCreateForm(forms.ModelForm):
 
     def save(self, commit=True):
         image = super().save(commit=False)
-        image_url = self.cleaned_data["url"]
-        
-        try:
-            image_content = ImageDownloadService.download_and_validate(image_url)
-            image_name = ImageDownloadService.generate_filename(image.title, image_url)
-            
-            image.image.save(
-                image_name,
-                ContentFile(image_content),
-                save=False
-            )
-        except ValueError as e:
-            raise forms.ValidationError(str(e))
+        image.status = Image.Status.PENDING
         
         if commit:
             image.save()
-        return image
\ No newline at end of file
+        return image
+
+class BookmarkImportForm(forms.Form):
+    file = forms.FileField(help_text="A .jsonl or .csv file of url, title and description rows.")
+
+    def clean_file(self):
+        file = self.cleaned_data["file"]
+        if file.size > settings.BOOKMARK_IMPORT_MAX_UPLOAD_BYTES:
+            raise forms.ValidationError(
+                f"The file is larger than {settings.BOOKMARK_IMPORT_MAX_UPLOAD_BYTES} bytes."
+            )
+        if not file.name.lower().endswith((".jsonl", ".ndjson", ".csv")):
+            raise forms.ValidationError("Bookmarks must be uploaded as a .jsonl or .csv file.")
+        return file
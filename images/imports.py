@@ -0,0 +1,343 @@
+import csv
+import io
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import close_old_connections, transaction
+from django.utils.text import slugify
+
+from bookmarks.redis_client import get_blocking_redis_client, get_redis_client
+from bookmarks.thumbnails import ThumbnailService
+from .forms import ImageDownloadService
+from .ingest import ImageIngestService
+from .models import BookmarkImport, Image
+from .search import ImageSearchIndex
+from .similarity import SimilarImageService
+
+logger = logging.getLogger(__name__)
+
+
+class BookmarkImportQueue:
+    QUEUE_KEY = "images:imports"
+
+    def __init__(self):
+        self.redis_client = get_redis_client()
+        self.blocking_client = get_blocking_redis_client()
+
+    def enqueue(self, job_id):
+        try:
+            self.redis_client.rpush(self.QUEUE_KEY, job_id)
+        except redis.RedisError:
+            logger.exception('Could not queue bookmark import %s, it will be picked up on recovery', job_id)
+
+    def dequeue(self, timeout):
+        item = self.blocking_client.blpop(self.QUEUE_KEY, timeout=timeout)
+        return int(item[1]) if item else None
+
+    def recover(self):
+        """Re-queue imports that were waiting or interrupted by a stopped worker."""
+        job_ids = list(
+            BookmarkImport.objects.filter(
+                status__in=[BookmarkImport.Status.PENDING, BookmarkImport.Status.RUNNING]
+            ).order_by("id").values_list("id", flat=True)
+        )
+        if job_ids:
+            pipe = self.redis_client.pipeline()
+            pipe.delete(self.QUEUE_KEY)
+            pipe.rpush(self.QUEUE_KEY, *job_ids)
+            pipe.execute()
+        return len(job_ids)
+
+
+class BookmarkImportService:
+    FORMATS = {
+        ".jsonl": BookmarkImport.Format.JSONL,
+        ".ndjson": BookmarkImport.Format.JSONL,
+        ".csv": BookmarkImport.Format.CSV,
+    }
+
+    @classmethod
+    def guess_format(cls, filename):
+        file_format = cls.FORMATS.get(os.path.splitext(filename)[1].lower())
+        if file_format is None:
+            raise ValueError("Bookmarks must be uploaded as a .jsonl or .csv file.")
+        return file_format
+
+    @classmethod
+    def create(cls, user, file, file_format=None, per_row_users=False):
+        return BookmarkImport.objects.create(
+            user=user,
+            file=file,
+            format=file_format or cls.guess_format(file.name),
+            per_row_users=per_row_users,
+        )
+
+    @classmethod
+    def submit(cls, job):
+        transaction.on_commit(lambda: BookmarkImportQueue().enqueue(job.id))
+
+
+class BookmarkImporter:
+    """
+    Runs one BookmarkImport. Rows are streamed from the file in batches;
+    each batch is downloaded through a bounded thread pool that allows at
+    most `per_host` requests to any one host, then the images that
+    downloaded are inserted with a single bulk_create.
+
+    The batch insert and the job's counters are committed together, so an
+    interrupted import resumes after the last committed row. Bookmarks the
+    owner already has (same URL) are skipped, which also makes importing
+    the same file twice harmless.
+    """
+    MAX_ERRORS = 100
+    url_validator = URLValidator(schemes=["http", "https"])
+
+    def __init__(self, job, workers=None, per_host=None, batch_size=None, progress=None):
+        self.job = job
+        self.workers = workers or settings.BOOKMARK_IMPORT_WORKERS
+        self.per_host = per_host or settings.BOOKMARK_IMPORT_PER_HOST
+        self.batch_size = batch_size or settings.BOOKMARK_IMPORT_BATCH_SIZE
+        self.progress = progress
+        self._current_row = None
+
+    def run(self):
+        job = self.job
+        job.status = BookmarkImport.Status.RUNNING
+        job.save(update_fields=["status", "updated"])
+
+        rows = itertools.islice(self.iter_rows(), job.rows_processed, None)
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bookmark-import") as executor:
+                while batch := list(itertools.islice(rows, self.batch_size)):
+                    self._import_batch(batch, executor)
+                    if self.progress:
+                        self.progress(job)
+        except Exception as e:
+            failed_row = self._current_row
+            # Drop counters of the batch that was rolled back.
+            job.refresh_from_db(fields=["rows_processed", "imported", "skipped", "failed", "errors"])
+            job.status = BookmarkImport.Status.FAILED
+            if failed_row is None:
+                # The batch failed as a whole (reading the file, saving), not on one row.
+                message = f"Import stopped after row {job.rows_processed}: {e}"
+            else:
+                message = f"Import stopped: {e}"
+            self._record_errors([{"row": failed_row, "error": message}])
+            job.save(update_fields=["status", "errors", "updated"])
+            raise
+
+        job.status = BookmarkImport.Status.DONE
+        job.save(update_fields=["status", "updated"])
+        return job
+
+    def iter_rows(self):
+        """Yield one dict per bookmark row; unreadable rows yield {'error': ...}."""
+        with self.job.file.open("rb") as raw:
+            text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+            if self.job.format == BookmarkImport.Format.CSV:
+                yield from csv.DictReader(text)
+                return
+            for line in text:
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield {"error": f"Invalid JSON: {e}"}
+                    continue
+                yield row if isinstance(row, dict) else {"error": "Row is not a JSON object."}
+
+    def _import_batch(self, rows, executor):
+        job = self.job
+        first_row = job.rows_processed + 1
+        owners = self._resolve_owners(rows)
+
+        bookmarks, errors = [], []
+        for row_number, row in enumerate(rows, first_row):
+            self._current_row = row_number
+            try:
+                bookmarks.append((row_number, *self._clean_row(row, owners)))
+            except ValueError as e:
+                errors.append({"row": row_number, "url": row.get("url", ""), "error": str(e)})
+        self._current_row = None
+
+        existing = set(
+            Image.objects.filter(
+                user_id__in={user_id for _, user_id, *_ in bookmarks},
+                url__in={url for _, _, url, *_ in bookmarks},
+            ).values_list("user_id", "url")
+        )
+        new_bookmarks = []
+        for bookmark in bookmarks:
+            key = (bookmark[1], bookmark[2])
+            if key not in existing:
+                existing.add(key)
+                new_bookmarks.append(bookmark)
+        skipped = len(bookmarks) - len(new_bookmarks)
+
+        urls = list(dict.fromkeys(url for _, _, url, *_ in new_bookmarks))
+        results = self._fetch_all(urls, executor)
+
+        images = []
+        for row_number, user_id, url, title, description in new_bookmarks:
+            result = results[url]
+            if isinstance(result, Exception):
+                errors.append({"row": row_number, "url": url, "error": str(result)})
+                continue
+            blob, phash = result
+            images.append(Image(
+                user_id=user_id,
+                title=title,
+                slug=slugify(title),
+                url=url,
+                description=description,
+                image=blob.file.name,
+                status=Image.Status.READY,
+                **SimilarImageService.hash_fields(phash),
+            ))
+
+        with transaction.atomic():
+            Image.objects.bulk_create(images)
+            ImageSearchIndex.index(images)
+            job.rows_processed += len(rows)
+            job.imported += len(images)
+            job.skipped += skipped
+            job.failed += len(errors)
+            self._record_errors(errors)
+            job.save(update_fields=["rows_processed", "imported", "skipped", "failed", "errors", "updated"])
+            for fieldfile in {image.image.name: image.image for image in images}.values():
+                ThumbnailService.generate_later(fieldfile)
+
+    def _resolve_owners(self, rows):
+        if not self.job.per_row_users:
+            return {}
+        usernames = {row.get("user") for row in rows if row.get("user") and isinstance(row["user"], str)}
+        return dict(
+            get_user_model().objects.filter(username__in=usernames, is_active=True)
+            .values_list("username", "id")
+        )
+
+    def _clean_row(self, row, owners):
+        if row.get("error"):
+            raise ValueError(row["error"])
+
+        user_id = self.job.user_id
+        if self.job.per_row_users and row.get("user"):
+            user_id = owners.get(self._text(row, "user"))
+            if user_id is None:
+                raise ValueError(f"Unknown user {row['user']!r}.")
+
+        url = self._text(row, "url")
+        try:
+            self.url_validator(url)
+        except ValidationError:
+            raise ValueError("Invalid URL.")
+        if len(url) > Image._meta.get_field("url").max_length:
+            raise ValueError("URL is too long.")
+        if not ImageDownloadService.validate_url_extension(url):
+            raise ValueError("The given URL does not match valid image extensions.")
+
+        title = self._text(row, "title")[:Image._meta.get_field("title").max_length]
+        if not title:
+            raise ValueError("Title is required.")
+        return user_id, url, title, self._text(row, "description")
+
+    @staticmethod
+    def _text(row, field):
+        # JSON rows can hold numbers, lists or objects where text is expected.
+        value = row.get(field) or ""
+        if not isinstance(value, str):
+            raise ValueError(f"The {field} field must be a string.")
+        return value.strip()
+
+    def _fetch_all(self, urls, executor):
+        """
+        Map every URL to its `_fetch` result. A URL is only submitted while
+        its host has fewer than `per_host` downloads running, so pool threads
+        never sit waiting on a busy host while other hosts are queued.
+        """
+        queued = defaultdict(deque)
+        for url in urls:
+            queued[urlsplit(url).hostname or ""].append(url)
+
+        running = {}
+
+        def submit(host):
+            url = queued[host].popleft()
+            running[executor.submit(self._fetch, url)] = host, url
+
+        for host, host_urls in queued.items():
+            for _ in range(min(self.per_host, len(host_urls))):
+                submit(host)
+
+        results = {}
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                host, url = running.pop(future)
+                results[url] = future.result()
+                if queued[host]:
+                    submit(host)
+        return results
+
+    def _fetch(self, url):
+        """Return the blob for `url` and its hash, downloading it if needed, or the error."""
+        try:
+            return ImageIngestService.fetch(url)
+        except (ValueError, OSError) as e:
+            return e
+        finally:
+            close_old_connections()
+
+    def _record_errors(self, errors):
+        room = self.MAX_ERRORS - len(self.job.errors)
+        if room > 0:
+            self.job.errors.extend(errors[:room])
+
+
+class BookmarkImportWorker:
+    def __init__(self, poll_timeout=5, **importer_options):
+        self.poll_timeout = poll_timeout
+        self.importer_options = importer_options
+        self.queue = BookmarkImportQueue()
+        self._stopped = threading.Event()
+
+    def run(self):
+        recovered = self.queue.recover()
+        if recovered:
+            logger.info('Re-queued %s bookmark import(s)', recovered)
+
+        while not self._stopped.is_set():
+            try:
+                job_id = self.queue.dequeue(self.poll_timeout)
+            except redis.RedisError:
+                logger.exception('Bookmark import queue unavailable')
+                time.sleep(self.poll_timeout)
+                continue
+            if job_id is None:
+                continue
+
+            job = BookmarkImport.objects.filter(id=job_id).exclude(status=BookmarkImport.Status.DONE).first()
+            if job is None:
+                continue
+            try:
+                BookmarkImporter(job, **self.importer_options).run()
+            except Exception:
+                logger.exception('Bookmark import %s failed', job_id)
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        self._stopped.set()
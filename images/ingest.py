@@ -0,0 +1,179 @@
+import datetime
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from actions.utils import create_action
+from bookmarks.redis_client import get_blocking_redis_client, get_redis_client
+from .blobs import ImageBlobStore
+from .forms import ImageDownloadService
+from .models import Image
+from .similarity import SimilarImageService
+
+logger = logging.getLogger(__name__)
+
+
+class ImageIngestQueue:
+    """
+    Redis-backed queue of image ids waiting to be downloaded. Failed jobs
+    wait in a sorted set scored by the time they are due again. Pending
+    images are also recoverable from the database, so a lost Redis entry
+    only delays a job until the next worker start.
+    """
+    QUEUE_KEY = "images:ingest"
+    RETRY_KEY = "images:ingest:retry"
+
+    def __init__(self):
+        self.redis_client = get_redis_client()
+        self.blocking_client = get_blocking_redis_client()
+
+    def enqueue(self, image_id):
+        try:
+            self.redis_client.rpush(self.QUEUE_KEY, image_id)
+        except redis.RedisError:
+            logger.exception('Could not queue image %s, it will be picked up on recovery', image_id)
+
+    def schedule_retry(self, image_id, delay):
+        self.redis_client.zadd(self.RETRY_KEY, {image_id: time.time() + delay})
+
+    def dequeue(self, timeout):
+        self._promote_due_retries()
+        item = self.blocking_client.blpop(self.QUEUE_KEY, timeout=timeout)
+        return int(item[1]) if item else None
+
+    def recover(self):
+        """
+        Re-queue pending images missing from Redis and images whose claim
+        outlived its lease. Other pools may be running, so live claims and
+        the queued entries are left alone.
+        """
+        stale = timezone.now() - datetime.timedelta(seconds=settings.IMAGE_INGEST_LEASE_SECONDS)
+        Image.objects.filter(
+            Q(processing_started__lt=stale) | Q(processing_started__isnull=True),
+            status=Image.Status.PROCESSING,
+        ).update(status=Image.Status.PENDING)
+        pending = set(Image.objects.filter(status=Image.Status.PENDING).values_list('id', flat=True))
+        if not pending:
+            return 0
+
+        pipe = self.redis_client.pipeline()
+        pipe.lrange(self.QUEUE_KEY, 0, -1)
+        pipe.zrange(self.RETRY_KEY, 0, -1)
+        queued, retrying = pipe.execute()
+        missing = sorted(pending - {int(image_id) for image_id in [*queued, *retrying]})
+        if missing:
+            self.redis_client.rpush(self.QUEUE_KEY, *missing)
+        return len(missing)
+
+    def _promote_due_retries(self):
+        due = self.redis_client.zrangebyscore(self.RETRY_KEY, '-inf', time.time())
+        for image_id in due:
+            if self.redis_client.zrem(self.RETRY_KEY, image_id):
+                self.redis_client.rpush(self.QUEUE_KEY, image_id)
+
+
+class ImageIngestService:
+    @classmethod
+    def submit(cls, image):
+        transaction.on_commit(lambda: ImageIngestQueue().enqueue(image.id))
+
+    @classmethod
+    def process(cls, image_id, queue=None):
+        claimed = Image.objects.filter(id=image_id, status=Image.Status.PENDING).update(
+            status=Image.Status.PROCESSING, processing_started=timezone.now()
+        )
+        if not claimed:
+            return None
+
+        image = Image.objects.select_related('user').get(id=image_id)
+        try:
+            blob, phash = cls.fetch(image.url)
+        except (ValueError, OSError) as e:
+            return cls._fail(image, str(e), queue)
+
+        image.image.name = blob.file.name
+        SimilarImageService.set_hash(image, phash)
+
+        image.status = Image.Status.READY
+        image.error = ''
+        image.save(update_fields=['image', 'status', 'error', *Image.PHASH_FIELDS])
+        create_action(image.user, "bookmarked image", image)
+        return image
+
+    @staticmethod
+    def fetch(url):
+        """
+        Return the blob for `url` and its perceptual hash, downloading it
+        unless the URL was fetched before.
+        """
+        blob = ImageBlobStore.find_by_url(url)
+        if blob is not None:
+            with blob.file.open('rb') as f:
+                return blob, SimilarImageService.hash_file(f)
+        with ImageDownloadService.download_and_validate(url) as image_file:
+            blob = ImageBlobStore.store(image_file, url=url)
+            return blob, SimilarImageService.hash_file(image_file)
+
+    @classmethod
+    def _fail(cls, image, error, queue):
+        image.attempts += 1
+        image.error = error[:500]
+        if image.attempts < settings.IMAGE_INGEST_MAX_ATTEMPTS:
+            image.status = Image.Status.PENDING
+            image.save(update_fields=['attempts', 'error', 'status'])
+            (queue or ImageIngestQueue()).schedule_retry(
+                image.id, settings.IMAGE_INGEST_RETRY_DELAY * image.attempts
+            )
+        else:
+            image.status = Image.Status.FAILED
+            image.save(update_fields=['attempts', 'error', 'status'])
+        logger.warning('Could not ingest image %s (attempt %s): %s', image.id, image.attempts, error)
+        return image
+
+
+class ImageIngestWorkerPool:
+    def __init__(self, concurrency=None, poll_timeout=5):
+        self.concurrency = concurrency or settings.IMAGE_INGEST_WORKERS
+        self.poll_timeout = poll_timeout
+        self.queue = ImageIngestQueue()
+        self._stopped = threading.Event()
+
+    def run(self):
+        recovered = self.queue.recover()
+        if recovered:
+            logger.info('Re-queued %s pending image(s)', recovered)
+
+        workers = threading.BoundedSemaphore(self.concurrency)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='image-ingest') as executor:
+            while not self._stopped.is_set():
+                workers.acquire()
+                try:
+                    image_id = self.queue.dequeue(self.poll_timeout)
+                except redis.RedisError:
+                    logger.exception('Image ingest queue unavailable')
+                    workers.release()
+                    time.sleep(self.poll_timeout)
+                    continue
+                if image_id is None:
+                    workers.release()
+                    continue
+                executor.submit(self._process, image_id, workers)
+
+    def stop(self):
+        self._stopped.set()
+
+    def _process(self, image_id, workers):
+        try:
+            ImageIngestService.process(image_id, self.queue)
+        except Exception:
+            logger.exception('Image ingest worker failed on image %s', image_id)
+        finally:
+            close_old_connections()
+            workers.release()
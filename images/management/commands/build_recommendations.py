@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from images.recommendations import ImageRecommendationService
+
+
+class Command(BaseCommand):
+    help = "Recompute co-like image recommendations from the likes table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--neighbours",
+            type=int,
+            help="Recommendations kept per image (default: RECOMMENDATION_NEIGHBOURS).",
+        )
+        parser.add_argument(
+            "--min-co-likes",
+            type=int,
+            help="Users two images need in common (default: RECOMMENDATION_MIN_CO_LIKES).",
+        )
+        parser.add_argument(
+            "--max-user-likes",
+            type=int,
+            help="Most recent likes counted per user (default: RECOMMENDATION_MAX_USER_LIKES, 0 for all).",
+        )
+        parser.add_argument(
+            "--loop",
+            type=int,
+            metavar="SECONDS",
+            help="Keep running and rebuild every SECONDS seconds.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            stats = ImageRecommendationService.rebuild(
+                neighbours=options["neighbours"],
+                min_co_likes=options["min_co_likes"],
+                max_user_likes=options["max_user_likes"],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Stored {stats['stored']} recommendation(s) for {stats['images']} image(s) from "
+                f"{stats['likes']} like(s) by {stats['users']} user(s) in {time.monotonic() - started:.1f}s."
+            ))
+            if not options["loop"]:
+                return
+            time.sleep(options["loop"])
@@ -0,0 +1,71 @@
+import os
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from easy_thumbnails.files import get_thumbnailer
+
+from actions.models import Action
+from actions.snapshots import ActionSnapshotService
+from images.blobs import ImageBlobStore
+from images.models import Image
+
+
+class Command(BaseCommand):
+    help = "Move existing image files into content-addressed storage and drop duplicates."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many files would be merged.",
+        )
+
+    def handle(self, *args, **options):
+        images = (
+            Image.objects.exclude(image="")
+            .exclude(image__startswith="images/blobs/")
+            .only("id", "image", "url")
+            .order_by("id")
+        )
+
+        image_ct = ContentType.objects.get_for_model(Image)
+        total_images = 0
+        refreshed_actions = 0
+        removed_files = 0
+        freed_bytes = 0
+        for image in images.iterator():
+            old_name = image.image.name
+            if not default_storage.exists(old_name):
+                self.stderr.write(f"Missing file for image {image.id}: {old_name}")
+                continue
+
+            with default_storage.open(old_name, "rb") as source:
+                sha256 = ImageBlobStore.hash_file(source)
+                if options["dry_run"]:
+                    total_images += 1
+                    continue
+                source.name = f"{sha256}{os.path.splitext(old_name)[1]}"
+                blob = ImageBlobStore.store(source, url=image.url, sha256=sha256)
+
+            Image.objects.filter(id=image.id).update(image=blob.file.name)
+            total_images += 1
+            # Snapshots link the old file's thumbnail, which is deleted below.
+            refreshed_actions += ActionSnapshotService.refresh(
+                Action.objects.filter(target_ct=image_ct, target_id=image.id)
+            )
+
+            if not Image.objects.filter(image=old_name).exists():
+                freed_bytes += default_storage.size(old_name)
+                get_thumbnailer(image.image, old_name).delete_thumbnails()
+                default_storage.delete(old_name)
+                removed_files += 1
+
+        if options["dry_run"]:
+            self.stdout.write(f"{total_images} image(s) would be moved to content-addressed storage.")
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {total_images} image(s), removed {removed_files} old file(s) "
+            f"({freed_bytes} bytes), refreshed {refreshed_actions} action snapshot(s)."
+        ))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from images.services import ImageViewService
+
+
+class Command(BaseCommand):
+    help = "Move view counts buffered in Redis into Image.views."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            type=int,
+            metavar="SECONDS",
+            help="Keep running and flush every SECONDS seconds.",
+        )
+        parser.add_argument(
+            "--import-counters",
+            action="store_true",
+            help="First merge the old image:{id}:views counters into the buffer.",
+        )
+
+    def handle(self, *args, **options):
+        view_service = ImageViewService()
+
+        if options["import_counters"]:
+            total = view_service.redis_service.merge_legacy_view_counters()
+            self.stdout.write(f"Merged {total} legacy view counter(s).")
+
+        while True:
+            total = view_service.flush()
+            self.stdout.write(self.style.SUCCESS(f"Flushed {total} view(s)."))
+            if not options["loop"]:
+                return
+            time.sleep(options["loop"])
@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import as_completed
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bookmarks.thumbnails import ThumbnailService, generate_aliases
+
+
+class Command(BaseCommand):
+    help = "Generate missing thumbnail aliases for existing images and profile photos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of worker processes (default: number of CPUs).",
+        )
+        parser.add_argument(
+            "--progress-every",
+            type=int,
+            default=100,
+            help="Report progress after this many files.",
+        )
+
+    def handle(self, *args, **options):
+        jobs = list(self.get_jobs())
+        total = len(jobs)
+        self.stdout.write(f"Checking thumbnails for {total} file(s)...")
+
+        failed = 0
+        with ThumbnailService.create_executor(options["workers"]) as executor:
+            futures = {executor.submit(generate_aliases, *job): job for job in jobs}
+            for done, future in enumerate(as_completed(futures), 1):
+                if future.exception() is not None:
+                    failed += 1
+                    self.stderr.write(f"Failed {futures[future][2]}: {future.exception()}")
+                if done % options["progress_every"] == 0 or done == total:
+                    self.stdout.write(f"{done}/{total} file(s) processed")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Thumbnails ready for {total - failed} file(s), {failed} failed."
+        ))
+
+    def get_jobs(self):
+        for target in settings.THUMBNAIL_ALIASES:
+            model_label, field_name = target.rsplit(".", 1)
+            model = apps.get_model(model_label)
+            names = (
+                model.objects.exclude(**{field_name: ""})
+                .order_by()
+                .values_list(field_name, flat=True)
+                .distinct()
+            )
+            for name in names.iterator():
+                yield model_label, field_name, name
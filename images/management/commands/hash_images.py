@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+
+from bookmarks.thumbnails import ThumbnailService
+from images.models import Image
+from images.similarity import SimilarImageService, hash_stored_file
+
+
+class Command(BaseCommand):
+    help = "Compute perceptual hashes for images bookmarked before they were hashed at ingest."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of worker processes (default: number of CPUs).",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rehash every image, not only those without a hash.",
+        )
+        parser.add_argument(
+            "--progress-every",
+            type=int,
+            default=500,
+            help="Report progress after this many files.",
+        )
+
+    def handle(self, *args, **options):
+        images = Image.objects.ready().exclude(image="")
+        if not options["all"]:
+            images = images.filter(phash__isnull=True)
+        # Images sharing a file (see ImageBlobStore) are hashed once.
+        names = list(images.order_by().values_list("image", flat=True).distinct())
+        total = len(names)
+        self.stdout.write(f"Hashing {total} file(s)...")
+
+        hashed = failed = 0
+        with ThumbnailService.create_executor(options["workers"]) as executor:
+            futures = {executor.submit(hash_stored_file, name): name for name in names}
+            for done, future in enumerate(as_completed(futures), 1):
+                name = futures[future]
+                try:
+                    phash = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"Failed {name}: {e}")
+                else:
+                    images.filter(image=name).update(**SimilarImageService.hash_fields(phash))
+                    hashed += 1
+                if done % options["progress_every"] == 0 or done == total:
+                    self.stdout.write(f"{done}/{total} file(s) processed")
+
+        self.stdout.write(self.style.SUCCESS(f"Hashed {hashed} file(s), {failed} failed."))
@@ -0,0 +1,115 @@
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from images.imports import BookmarkImporter, BookmarkImportService, BookmarkImportWorker
+from images.models import BookmarkImport
+
+
+class Command(BaseCommand):
+    help = (
+        "Import bookmarks from a JSONL or CSV file of user, url, title and description rows, "
+        "resume an interrupted import, or process imports uploaded through the site."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="JSONL or CSV file to import.")
+        parser.add_argument(
+            "--user",
+            help="Owner of the import and of rows without a user column (required with a path).",
+        )
+        parser.add_argument(
+            "--format",
+            choices=BookmarkImport.Format.values,
+            help="File format (default: guessed from the extension).",
+        )
+        parser.add_argument("--resume", type=int, metavar="ID", help="Resume the import with this id.")
+        parser.add_argument(
+            "--worker",
+            action="store_true",
+            help="Process uploaded imports from the queue until interrupted.",
+        )
+        parser.add_argument("--workers", type=int, help="Download threads (default: BOOKMARK_IMPORT_WORKERS).")
+        parser.add_argument(
+            "--per-host",
+            type=int,
+            help="Concurrent downloads per host (default: BOOKMARK_IMPORT_PER_HOST).",
+        )
+        parser.add_argument("--batch-size", type=int, help="Rows per insert (default: BOOKMARK_IMPORT_BATCH_SIZE).")
+
+    def handle(self, *args, **options):
+        importer_options = {
+            "workers": options["workers"],
+            "per_host": options["per_host"],
+            "batch_size": options["batch_size"],
+        }
+
+        if options["worker"]:
+            worker = BookmarkImportWorker(**importer_options)
+            self.stdout.write("Waiting for bookmark imports.")
+            try:
+                worker.run()
+            except KeyboardInterrupt:
+                worker.stop()
+            return
+
+        if options["resume"]:
+            try:
+                job = BookmarkImport.objects.get(id=options["resume"])
+            except BookmarkImport.DoesNotExist:
+                raise CommandError(f"Import {options['resume']} does not exist.")
+            if job.status == BookmarkImport.Status.DONE:
+                raise CommandError(f"Import {job.id} has already finished.")
+        else:
+            job = self.create_job(options)
+
+        self.stdout.write(f"Running import {job.id} from row {job.rows_processed + 1}.")
+        started = time.monotonic()
+        start_rows = job.rows_processed
+
+        def report(job):
+            elapsed = time.monotonic() - started
+            rate = (job.rows_processed - start_rows) / elapsed if elapsed else 0
+            self.stdout.write(
+                f"{job.rows_processed} row(s): {job.imported} imported, {job.skipped} skipped, "
+                f"{job.failed} failed ({rate:.1f} rows/s)"
+            )
+
+        try:
+            BookmarkImporter(job, progress=report, **importer_options).run()
+        except KeyboardInterrupt:
+            raise CommandError(f"Interrupted; resume with --resume {job.id}.")
+        except Exception as e:
+            raise CommandError(f"Import {job.id} failed: {e}; resume with --resume {job.id}.")
+
+        for error in job.errors:
+            url = f" ({error['url']})" if error.get("url") else ""
+            location = f"Row {error['row']}{url}: " if error["row"] else ""
+            self.stderr.write(f"{location}{error['error']}")
+        if job.failed > len(job.errors):
+            self.stderr.write(f"... and {job.failed - len(job.errors)} more failed row(s).")
+        self.stdout.write(self.style.SUCCESS(
+            f"Import {job.id} finished: {job.imported} imported, {job.skipped} skipped, "
+            f"{job.failed} failed in {time.monotonic() - started:.1f}s."
+        ))
+
+    def create_job(self, options):
+        if not options["path"] or not options["user"]:
+            raise CommandError("Give a file and --user, or --resume ID, or --worker.")
+        try:
+            user = get_user_model().objects.get(username=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist.")
+
+        path = options["path"]
+        try:
+            file_format = options["format"] or BookmarkImportService.guess_format(path)
+            with open(path, "rb") as f:
+                return BookmarkImportService.create(
+                    user, File(f, name=os.path.basename(path)), file_format, per_row_users=True
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
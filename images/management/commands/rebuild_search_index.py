@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from images.search import ImageSearchIndex
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of image titles and descriptions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=ImageSearchIndex.REBUILD_BATCH_SIZE,
+            help="Images read per query.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        with transaction.atomic():
+            total = ImageSearchIndex.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {total} image(s) in {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from images.models import Image
+
+
+class Command(BaseCommand):
+    help = "Recompute total_likes for every image with a single UPDATE."
+
+    def handle(self, *args, **options):
+        likes = (
+            Image.users_like.through.objects.filter(image_id=OuterRef('pk'))
+            .values('image_id')
+            .annotate(total=Count('*'))
+            .values('total')
+        )
+        updated = Image.objects.update(
+            total_likes=Coalesce(Subquery(likes, output_field=IntegerField()), Value(0))
+        )
+        self.stdout.write(self.style.SUCCESS(f"Reconciled like counts of {updated} image(s)."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from images.ingest import ImageIngestWorkerPool
+
+
+class Command(BaseCommand):
+    help = "Download and store bookmarked images queued for ingestion."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            help="Number of download workers (default: IMAGE_INGEST_WORKERS).",
+        )
+
+    def handle(self, *args, **options):
+        pool = ImageIngestWorkerPool(concurrency=options["concurrency"])
+        self.stdout.write(f"Starting {pool.concurrency} image ingest worker(s).")
+        try:
+            pool.run()
+        except KeyboardInterrupt:
+            pool.stop()
+            self.stdout.write(self.style.SUCCESS("Stopped, waiting for running downloads."))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("images", "0003_image_images_imag_user_id_efc684_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="image",
+            name="views",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="image",
+            index=models.Index(fields=["-views"], name="images_imag_views_bea102_idx"),
+        ),
+    ]
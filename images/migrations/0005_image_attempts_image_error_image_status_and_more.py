@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("images", "0004_image_views_image_images_imag_views_bea102_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="image",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="error",
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="status",
+            field=models.CharField(choices=[("pending", "Pending"), ("processing", "Processing"), ("ready", "Ready"), ("failed", "Failed")], default="ready", max_length=10),
+        ),
+        migrations.AlterField(
+            model_name="image",
+            name="image",
+            field=models.ImageField(blank=True, upload_to="images/%Y/%m/%d"),
+        ),
+    ]
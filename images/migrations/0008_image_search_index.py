@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from images.search import BACKENDS
+
+    backend_class = BACKENDS.get(schema_editor.connection.vendor)
+    if backend_class is None:
+        return
+    backend = backend_class()
+    Image = apps.get_model("images", "Image")
+    with schema_editor.connection.cursor() as cursor:
+        for sql in backend.create_sql():
+            cursor.execute(sql)
+        rows = list(Image.objects.values_list("id", "title", "description"))
+        if rows:
+            backend.index(cursor, rows)
+
+
+def drop_search_index(apps, schema_editor):
+    from images.search import BACKENDS
+
+    backend_class = BACKENDS.get(schema_editor.connection.vendor)
+    if backend_class is None:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sql in backend_class().drop_sql():
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("images", "0007_bookmarkimport"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
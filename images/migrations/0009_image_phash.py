@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("images", "0008_image_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="image",
+            name="phash",
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="phash_0",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="phash_1",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="phash_2",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="phash_3",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="image",
+            index=models.Index(fields=["phash_0"], name="images_imag_phash_0_079141_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="image",
+            index=models.Index(fields=["phash_1"], name="images_imag_phash_1_3c5d7a_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="image",
+            index=models.Index(fields=["phash_2"], name="images_imag_phash_2_1aba2b_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="image",
+            index=models.Index(fields=["phash_3"], name="images_imag_phash_3_1192e3_idx"),
+        ),
+    ]
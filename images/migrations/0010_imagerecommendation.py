@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("images", "0009_image_phash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageRecommendation",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("score", models.FloatField()),
+                ("image", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="recommendations", to="images.image")),
+                ("recommended", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="recommended_for", to="images.image")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["image", "-score"], name="images_imag_image_i_72eed5_idx")],
+                "constraints": [models.UniqueConstraint(fields=("image", "recommended"), name="unique_image_recommendation")],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("images", "0010_imagerecommendation"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="image",
+            index=models.Index(fields=["status", "-created", "-id"], name="images_imag_status_b31ccd_idx"),
+        ),
+    ]
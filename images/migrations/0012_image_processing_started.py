@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("images", "0011_image_status_created_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="image",
+            name="processing_started",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import hashlib
+
 from django.conf import settings
 from django.db import models
 from django.urls import reverse
@@ -14,8 +16,14 @@ class ImageQuerySet(models.QuerySet):
     def most_liked(self):
         return self.order_by('-total_likes')
     
+    def most_viewed(self):
+        return self.order_by('-views')
+    
     def recent(self):
         return self.order_by('-created')
+    
+    def ready(self):
+        return self.filter(status=Image.Status.READY)
 
 
 class ImageManager(models.Manager):
@@ -31,11 +39,23 @@ class ImageManager(models.Manager):
     def most_liked(self):
         return self.get_queryset().most_liked()
     
+    def most_viewed(self):
+        return self.get_queryset().most_viewed()
+    
     def recent(self):
         return self.get_queryset().recent()
+    
+    def ready(self):
+        return self.get_queryset().ready()
 
 
 class Image(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        READY = "ready", "Ready"
+        FAILED = "failed", "Failed"
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         related_name="images_created",
@@ -44,7 +64,17 @@ class Image(models.Model):
     title = models.CharField(max_length=256)
     slug = models.SlugField(max_length=256, blank=True)
     url = models.URLField(max_length=2000)
-    image = models.ImageField(upload_to="images/%Y/%m/%d")
+    image = models.ImageField(upload_to="images/%Y/%m/%d", blank=True)
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.READY
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.CharField(max_length=500, blank=True)
+    # When an ingest worker claimed the image; claims older than
+    # IMAGE_INGEST_LEASE_SECONDS are taken to belong to a stopped worker.
+    processing_started = models.DateTimeField(null=True, blank=True, editable=False)
     description = models.TextField(blank=True)
     created = models.DateTimeField(auto_now_add=True)
     users_like = models.ManyToManyField(
@@ -53,14 +83,30 @@ class Image(models.Model):
         blank=True
     )
     total_likes = models.PositiveIntegerField(default=0)
-    
+    views = models.PositiveIntegerField(default=0)
+    # 64-bit difference hash of the picture, stored as a signed integer, and
+    # its four 16-bit bands, which are indexed for near-duplicate lookups.
+    phash = models.BigIntegerField(null=True, blank=True, editable=False)
+    phash_0 = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    phash_1 = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    phash_2 = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    phash_3 = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    PHASH_FIELDS = ["phash", "phash_0", "phash_1", "phash_2", "phash_3"]
+
     objects = ImageManager()
 
     class Meta:
         indexes = [
             models.Index(fields=["-created"]),
             models.Index(fields=["-total_likes"]),
+            models.Index(fields=["-views"]),
             models.Index(fields=["user", "-created"]),
+            models.Index(fields=["status", "-created", "-id"]),
+            models.Index(fields=["phash_0"]),
+            models.Index(fields=["phash_1"]),
+            models.Index(fields=["phash_2"]),
+            models.Index(fields=["phash_3"]),
         ]
         ordering = ["-created"]
 
@@ -75,6 +121,14 @@ class Image(models.Model):
     def get_absolute_url(self):
         return reverse("images:detail", args=[self.id, self.slug])
     
+    def get_recent_likers(self, count):
+        likes = (
+            Image.users_like.through.objects.filter(image_id=self.id)
+            .select_related('user__profile')
+            .order_by('-id')[:count]
+        )
+        return [like.user for like in likes]
+
     def is_liked_by(self, user):
         return self.users_like.filter(id=user.id).exists()
     
@@ -84,4 +138,103 @@ class Image(models.Model):
             return False
         else:
             self.users_like.add(user)
-            return True
\ No newline at end of file
+            return True
+
+
+class ImageBlob(models.Model):
+    """A stored image file, addressed by the SHA-256 of its bytes."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.ImageField(upload_to="images/blobs")
+    size = models.PositiveIntegerField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+
+class ImageSource(models.Model):
+    """Index of source URLs already downloaded into a blob."""
+    url_hash = models.CharField(max_length=64, unique=True)
+    url = models.URLField(max_length=2000)
+    blob = models.ForeignKey(
+        ImageBlob,
+        related_name="sources",
+        on_delete=models.CASCADE
+    )
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.url
+
+    @staticmethod
+    def hash_url(url):
+        return hashlib.sha256(url.encode()).hexdigest()
+
+
+class ImageRecommendation(models.Model):
+    """A precomputed "people who liked this also liked" neighbour of an image."""
+    image = models.ForeignKey(
+        Image,
+        related_name="recommendations",
+        on_delete=models.CASCADE
+    )
+    recommended = models.ForeignKey(
+        Image,
+        related_name="recommended_for",
+        on_delete=models.CASCADE
+    )
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["image", "-score"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["image", "recommended"], name="unique_image_recommendation"),
+        ]
+
+    def __str__(self):
+        return f"{self.image_id} -> {self.recommended_id}"
+
+
+class BookmarkImport(models.Model):
+    """A bulk import of bookmarks from a JSONL or CSV file of url/title/description rows."""
+    class Format(models.TextChoices):
+        JSONL = "jsonl", "JSON Lines"
+        CSV = "csv", "CSV"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="bookmark_imports",
+        on_delete=models.CASCADE
+    )
+    file = models.FileField(upload_to="imports/%Y/%m/%d")
+    format = models.CharField(max_length=5, choices=Format.choices)
+    per_row_users = models.BooleanField(
+        default=False,
+        help_text="Take the owner of each bookmark from the row's user column."
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    rows_processed = models.PositiveIntegerField(default=0)
+    imported = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created"]
+
+    def __str__(self):
+        return f"Import {self.id} by {self.user}"
@@ -0,0 +1,184 @@
+import heapq
+import math
+from array import array
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import Image, ImageRecommendation
+
+
+class LikeMatrix:
+    """
+    Binary sparse matrix in compressed sparse row (CSR) form, as in SciPy:
+    the columns set in row `r` are `indices[indptr[r]:indptr[r + 1]]`. The
+    buffers are typed arrays, so even millions of likes take a few bytes
+    each instead of a Python object per cell.
+    """
+
+    def __init__(self, indptr, indices, n_columns):
+        self.indptr = indptr
+        self.indices = indices
+        self.n_columns = n_columns
+
+    @property
+    def n_rows(self):
+        return len(self.indptr) - 1
+
+    def row(self, r):
+        return self.indices[self.indptr[r]:self.indptr[r + 1]]
+
+    def row_length(self, r):
+        return self.indptr[r + 1] - self.indptr[r]
+
+    def transpose(self):
+        """The same matrix with rows and columns swapped (CSR -> CSC), by counting sort."""
+        indptr = array("q", [0]) * (self.n_columns + 1)
+        for column in self.indices:
+            indptr[column + 1] += 1
+        for column in range(self.n_columns):
+            indptr[column + 1] += indptr[column]
+
+        indices = array("l", [0]) * len(self.indices)
+        fill = array("q", indptr[:-1])
+        for r in range(self.n_rows):
+            for column in self.row(r):
+                indices[fill[column]] = r
+                fill[column] += 1
+        return LikeMatrix(indptr, indices, self.n_rows)
+
+    @classmethod
+    def from_likes(cls, max_row_likes=None):
+        """
+        Load the user x image matrix of likes on ready images. Users with more
+        than `max_row_likes` likes keep only their most recent ones, which
+        bounds the quadratic co-like work a single heavy user adds.
+
+        Returns the matrix and the image id of every column.
+        """
+        likes = (
+            Image.users_like.through.objects.filter(image__status=Image.Status.READY)
+            .order_by("user_id", "-id")
+            .values_list("user_id", "image_id")
+        )
+        indptr = array("q", [0])
+        indices = array("l")
+        image_ids = array("q")
+        columns = {}
+        current_user = None
+        row_likes = 0
+        for user_id, image_id in likes.iterator(chunk_size=10000):
+            if user_id != current_user:
+                if current_user is not None:
+                    indptr.append(len(indices))
+                current_user = user_id
+                row_likes = 0
+            if max_row_likes and row_likes >= max_row_likes:
+                continue
+            column = columns.get(image_id)
+            if column is None:
+                column = columns[image_id] = len(image_ids)
+                image_ids.append(image_id)
+            indices.append(column)
+            row_likes += 1
+        if current_user is not None:
+            indptr.append(len(indices))
+        return cls(indptr, indices, len(image_ids)), image_ids
+
+
+def cosine_neighbours(likes, k, min_co_likes=1):
+    """
+    Yield `(column, [(score, other_column), ...])` with the `k` columns of
+    `likes` most similar to each column by cosine similarity, best first.
+
+    For binary likes the cosine of two images is their co-like count divided
+    by the geometric mean of their like counts. Co-like counts of one image
+    against all others (one row of likes^T x likes) are accumulated in a
+    dense scratch array that is reset through the list of touched columns,
+    so each image costs time proportional to its co-likes, not to the
+    number of images.
+    """
+    by_image = likes.transpose()
+    co_likes = array("l", [0]) * likes.n_columns
+    for column in range(likes.n_columns):
+        touched = []
+        for user in by_image.row(column):
+            for other in likes.row(user):
+                if not co_likes[other]:
+                    touched.append(other)
+                co_likes[other] += 1
+
+        degree = by_image.row_length(column)
+        scored = []
+        for other in touched:
+            count = co_likes[other]
+            co_likes[other] = 0
+            if other != column and count >= min_co_likes:
+                scored.append((count / math.sqrt(degree * by_image.row_length(other)), other))
+        if scored:
+            yield column, heapq.nlargest(k, scored)
+
+
+class ImageRecommendationService:
+    """
+    "People who liked this also liked" recommendations. `rebuild` is a batch
+    job (see the build_recommendations command) that stores the top
+    neighbours of every image; pages only read them back through the
+    (image, -score) index.
+    """
+    RECENT_LIKES = 20
+    BATCH_SIZE = 1000
+
+    @classmethod
+    def rebuild(cls, neighbours=None, min_co_likes=None, max_user_likes=None):
+        neighbours = neighbours or settings.RECOMMENDATION_NEIGHBOURS
+        min_co_likes = min_co_likes or settings.RECOMMENDATION_MIN_CO_LIKES
+        if max_user_likes is None:
+            max_user_likes = settings.RECOMMENDATION_MAX_USER_LIKES
+
+        likes, image_ids = LikeMatrix.from_likes(max_user_likes)
+        # Score everything before the transaction so the table is only
+        # locked for the swap, not for the computation.
+        recommendations = [
+            (image_ids[column], image_ids[other], score)
+            for column, scored in cosine_neighbours(likes, neighbours, min_co_likes)
+            for score, other in scored
+        ]
+
+        with transaction.atomic():
+            ImageRecommendation.objects.all().delete()
+            for start in range(0, len(recommendations), cls.BATCH_SIZE):
+                ImageRecommendation.objects.bulk_create([
+                    ImageRecommendation(image_id=image_id, recommended_id=recommended_id, score=score)
+                    for image_id, recommended_id, score in recommendations[start:start + cls.BATCH_SIZE]
+                ])
+        return {
+            "users": likes.n_rows,
+            "images": likes.n_columns,
+            "likes": len(likes.indices),
+            "stored": len(recommendations),
+        }
+
+    @staticmethod
+    def for_image(image, limit=None):
+        recommendations = (
+            ImageRecommendation.objects.filter(image=image, recommended__status=Image.Status.READY)
+            .select_related("recommended")
+            .order_by("-score")[:limit or settings.RECOMMENDATION_COUNT]
+        )
+        return [recommendation.recommended for recommendation in recommendations]
+
+    @classmethod
+    def for_user(cls, user, limit=None):
+        """Neighbours of the user's recent likes they have neither liked nor bookmarked."""
+        liked = Image.users_like.through.objects.filter(user_id=user.id)
+        recent = liked.order_by("-id").values("image_id")[:cls.RECENT_LIKES]
+        return list(
+            Image.objects.ready()
+            .filter(recommended_for__image_id__in=recent)
+            .exclude(id__in=liked.values("image_id"))
+            .exclude(user=user)
+            .annotate(recommendation_score=Sum("recommended_for__score"))
+            .order_by("-recommendation_score", "-id")[:limit or settings.RECOMMENDATION_COUNT]
+        )
@@ -0,0 +1,230 @@
+import re
+
+from django.db import connection
+
+from bookmarks.pagination import CursorPaginator
+from .models import Image
+
+
+class SQLiteSearchBackend:
+    """FTS5 index in `images_image_fts`, keyed by image id (its rowid)."""
+    TABLE = "images_image_fts"
+    # bm25 column weights for title and description.
+    WEIGHTS = (5.0, 1.0)
+
+    def create_sql(self):
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLE} "
+            f"USING fts5(title, description, tokenize = 'porter unicode61')"
+        ]
+
+    def drop_sql(self):
+        return [f"DROP TABLE IF EXISTS {self.TABLE}"]
+
+    def build_query(self, terms):
+        # Every term must match; the last one is also matched as a prefix so
+        # results appear while the user is still typing.
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+
+    def index(self, cursor, rows):
+        cursor.executemany(f"DELETE FROM {self.TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {self.TABLE} (rowid, title, description) VALUES (%s, %s, %s)", rows
+        )
+
+    def remove(self, cursor, image_ids):
+        cursor.executemany(f"DELETE FROM {self.TABLE} WHERE rowid = %s", [(image_id,) for image_id in image_ids])
+
+    def clear(self, cursor):
+        cursor.execute(f"DELETE FROM {self.TABLE}")
+
+    def match_sql(self, query):
+        return f"SELECT rowid FROM {self.TABLE} WHERE {self.TABLE} MATCH %s", [query]
+
+    def ranked_sql(self):
+        # bm25() is lower for better matches; negate it so better is higher.
+        return (
+            f"SELECT rowid AS id, -bm25({self.TABLE}, {', '.join(map(str, self.WEIGHTS))}) AS score "
+            f"FROM {self.TABLE} WHERE {self.TABLE} MATCH %s"
+        )
+
+
+class PostgresSearchBackend:
+    """tsvector index in `images_image_search` with a GIN index."""
+    TABLE = "images_image_search"
+    CONFIG = "english"
+
+    def create_sql(self):
+        return [
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+            f"image_id bigint PRIMARY KEY REFERENCES images_image (id) ON DELETE CASCADE "
+            f"DEFERRABLE INITIALLY DEFERRED, "
+            f"document tsvector NOT NULL)",
+            f"CREATE INDEX IF NOT EXISTS {self.TABLE}_document_idx ON {self.TABLE} USING gin (document)",
+        ]
+
+    def drop_sql(self):
+        return [f"DROP TABLE IF EXISTS {self.TABLE}"]
+
+    def build_query(self, terms):
+        terms = [f"{term}:*" if i == len(terms) - 1 else term for i, term in enumerate(terms)]
+        return " & ".join(terms)
+
+    def index(self, cursor, rows):
+        cursor.executemany(
+            f"INSERT INTO {self.TABLE} (image_id, document) VALUES (%s, "
+            f"setweight(to_tsvector('{self.CONFIG}', %s), 'A') || "
+            f"setweight(to_tsvector('{self.CONFIG}', %s), 'B')) "
+            f"ON CONFLICT (image_id) DO UPDATE SET document = EXCLUDED.document",
+            rows,
+        )
+
+    def remove(self, cursor, image_ids):
+        cursor.execute(f"DELETE FROM {self.TABLE} WHERE image_id = ANY(%s)", [list(image_ids)])
+
+    def clear(self, cursor):
+        cursor.execute(f"TRUNCATE {self.TABLE}")
+
+    def match_sql(self, query):
+        return (
+            f"SELECT image_id FROM {self.TABLE} "
+            f"WHERE document @@ to_tsquery('{self.CONFIG}', %s)",
+            [query],
+        )
+
+    def ranked_sql(self):
+        return (
+            f"SELECT image_id AS id, ts_rank_cd(document, to_tsquery('{self.CONFIG}', %s)) AS score "
+            f"FROM {self.TABLE} WHERE document @@ to_tsquery('{self.CONFIG}', %s)"
+        )
+
+
+BACKENDS = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_backend(using_connection=None):
+    return BACKENDS[(using_connection or connection).vendor]()
+
+
+class ImageSearchIndex:
+    """
+    Inverted index over image titles and descriptions: SQLite FTS5, or a
+    tsvector table on PostgreSQL. Image signals keep it in sync inside the
+    saving transaction; bulk writers call `index` themselves.
+    """
+    TERM_RE = re.compile(r"\w+", re.UNICODE)
+    MAX_TERMS = 16
+    REBUILD_BATCH_SIZE = 1000
+
+    @classmethod
+    def parse(cls, text):
+        """Return the backend query for free text, or None when it has no terms."""
+        terms = cls.TERM_RE.findall((text or "").lower())[:cls.MAX_TERMS]
+        return get_backend().build_query(terms) if terms else None
+
+    @classmethod
+    def index(cls, images):
+        rows = [(image.id, image.title, image.description) for image in images]
+        if rows:
+            with connection.cursor() as cursor:
+                get_backend().index(cursor, rows)
+
+    @classmethod
+    def remove(cls, image_ids):
+        if image_ids:
+            with connection.cursor() as cursor:
+                get_backend().remove(cursor, image_ids)
+
+    @classmethod
+    def rebuild(cls, batch_size=None):
+        batch_size = batch_size or cls.REBUILD_BATCH_SIZE
+        backend = get_backend()
+        total = 0
+        last_id = 0
+        with connection.cursor() as cursor:
+            backend.clear(cursor)
+            while True:
+                rows = list(
+                    Image.objects.filter(id__gt=last_id).order_by("id")
+                    .values_list("id", "title", "description")[:batch_size]
+                )
+                if not rows:
+                    return total
+                backend.index(cursor, rows)
+                total += len(rows)
+                last_id = rows[-1][0]
+
+    @classmethod
+    def filter(cls, queryset, text):
+        """Restrict `queryset` to images matching `text`, unranked (used by the admin)."""
+        query = cls.parse(text)
+        if query is None:
+            return queryset
+        sql, params = get_backend().match_sql(query)
+        return queryset.extra(where=[f"{queryset.model._meta.db_table}.id IN ({sql})"], params=params)
+
+    @classmethod
+    def search(cls, text):
+        return ImageSearchResults(cls.parse(text))
+
+
+class ImageSearchResults:
+    """
+    Ready images matching a query, best first, loaded page by page through
+    the `seek` protocol of CursorPaginator with `(score, id)` positions.
+    """
+
+    def __init__(self, query):
+        self.query = query
+
+    def seek(self, position, reverse, limit):
+        if self.query is None:
+            return []
+        ranked_sql = get_backend().ranked_sql()
+        params = [self.query] * ranked_sql.count("%s") + [Image.Status.READY]
+
+        where = ""
+        if position is not None:
+            score, pk = position
+            lookup = ">" if reverse else "<"
+            where = f"AND (hits.score {lookup} %s OR (hits.score = %s AND hits.id {lookup} %s))"
+            params += [score, score, pk]
+        order = "ASC" if reverse else "DESC"
+
+        sql = (
+            f"SELECT hits.id, hits.score FROM ({ranked_sql}) hits "
+            f"JOIN {Image._meta.db_table} image ON image.id = hits.id "
+            f"WHERE image.status = %s {where} "
+            f"ORDER BY hits.score {order}, hits.id {order} LIMIT %s"
+        )
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            hits = cursor.fetchall()
+
+        images = Image.objects.select_related("user").in_bulk([image_id for image_id, _ in hits])
+        results = []
+        for image_id, score in hits:
+            image = images.get(image_id)
+            if image is not None:
+                image.search_rank = score
+                results.append(image)
+        return results
+
+
+class SearchCursorPaginator(CursorPaginator):
+    """Cursor paginator over `(search_rank, id)` positions."""
+
+    def __init__(self, object_list, per_page, field="search_rank"):
+        super().__init__(object_list, per_page, field)
+
+    def encode_value(self, value):
+        return value
+
+    def decode_value(self, value):
+        return float(value)
@@ -1,64 +1,328 @@
+import datetime
+import logging
+import uuid
+
 import redis
 from django.conf import settings
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Exists, F, OuterRef, PositiveIntegerField, Value, When
+from django.utils import timezone
+from actions.utils import create_action
+from bookmarks.pagination import CursorPaginator
+from bookmarks.redis_client import get_redis_client
+from bookmarks.thumbnails import ThumbnailService
 from .models import Image
 
+logger = logging.getLogger(__name__)
+
 
 class RedisService:
+    RANKING_KEY = "image_ranking"
+    HOURLY_RANKING_KEY = "image_ranking:hour:{hour}"
+    WINDOW_RANKING_KEY = "image_ranking:{window}"
+    # window -> (hours merged, half-life in hours of a view's weight)
+    RANKING_WINDOWS = {
+        "day": (24, 6),
+        "week": (24 * 7, 48),
+    }
+    WINDOW_RANKING_SIZE = 1000
+    PENDING_VIEWS_KEY = "image_views:pending"
+    FLUSHING_VIEWS_KEY = "image_views:flushing"
+    FLUSH_LOCK_KEY = "image_views:flush_lock"
+    # Longer than any flush; a crashed flush holds the lock at most this long.
+    FLUSH_LOCK_TIMEOUT = 300
+
     def __init__(self):
-        self.redis_client = redis.Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            db=settings.REDIS_DB
-        )
+        self.redis_client = get_redis_client()
+    
+    def record_view(self, image_id):
+        hour_key = self.hourly_ranking_key(timezone.now())
+        max_hours = max(hours for hours, _ in self.RANKING_WINDOWS.values())
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hincrby(self.PENDING_VIEWS_KEY, image_id, 1)
+        pipe.zincrby(self.RANKING_KEY, 1, image_id)
+        pipe.zincrby(hour_key, 1, image_id)
+        pipe.expire(hour_key, (max_hours + 1) * 3600)
+        pending_views, *_ = pipe.execute()
+        return pending_views
     
-    def increment_views(self, image_id):
-        return self.redis_client.incr(f'image:{image_id}:views')
+    def hourly_ranking_key(self, moment):
+        return self.HOURLY_RANKING_KEY.format(hour=moment.strftime("%Y%m%d%H"))
     
-    def increment_ranking(self, image_id):
-        return self.redis_client.zincrby("image_ranking", 1, image_id)
+    def take_pending_views(self):
+        if not self.redis_client.exists(self.FLUSHING_VIEWS_KEY):
+            try:
+                self.redis_client.rename(self.PENDING_VIEWS_KEY, self.FLUSHING_VIEWS_KEY)
+            except redis.ResponseError:
+                return {}
+        return {
+            int(image_id): int(views)
+            for image_id, views in self.redis_client.hgetall(self.FLUSHING_VIEWS_KEY).items()
+        }
     
-    def get_top_ranked_images(self, count=10):
-        image_ids = self.redis_client.zrange(
-            "image_ranking", 0, -1, desc=True
-        )[:count]
+    def clear_flushed_views(self):
+        self.redis_client.delete(self.FLUSHING_VIEWS_KEY)
+
+    def acquire_flush_lock(self):
+        """Return a token if no other flush is running, else None."""
+        token = uuid.uuid4().hex
+        if self.redis_client.set(self.FLUSH_LOCK_KEY, token, nx=True, ex=self.FLUSH_LOCK_TIMEOUT):
+            return token
+        return None
+
+    def release_flush_lock(self, token):
+        # Only delete the lock if it is still ours, i.e. it has not expired
+        # and been taken by another flush.
+        with self.redis_client.pipeline() as pipe:
+            try:
+                pipe.watch(self.FLUSH_LOCK_KEY)
+                if pipe.get(self.FLUSH_LOCK_KEY) == token.encode():
+                    pipe.multi()
+                    pipe.delete(self.FLUSH_LOCK_KEY)
+                    pipe.execute()
+            except redis.WatchError:
+                pass
+    
+    def merge_legacy_view_counters(self):
+        """Move the old per-image `image:{id}:views` counters into the pending hash."""
+        total = 0
+        for key in self.redis_client.scan_iter("image:*:views"):
+            views = self.redis_client.getdel(key)
+            if views:
+                image_id = key.decode().split(":")[1]
+                self.redis_client.hincrby(self.PENDING_VIEWS_KEY, image_id, int(views))
+                total += 1
+        return total
+    
+    def get_top_ranked_images(self, count=10, window=None):
+        key = self.RANKING_KEY if window is None else self.build_window_ranking(window)
+        image_ids = self.redis_client.zrange(key, 0, count - 1, desc=True)
         return [int(id) for id in image_ids]
+    
+    def build_window_ranking(self, window, force=False):
+        """
+        Merge the hourly buckets of `window` into one sorted set, weighting
+        each bucket by exponential decay, and cache it for
+        IMAGE_RANKING_REFRESH_SECONDS.
+        """
+        key = self.WINDOW_RANKING_KEY.format(window=window)
+        if not force and self.redis_client.exists(key):
+            return key
+
+        hours, half_life = self.RANKING_WINDOWS[window]
+        now = timezone.now()
+        weights = {
+            self.hourly_ranking_key(now - datetime.timedelta(hours=age)): 0.5 ** (age / half_life)
+            for age in range(hours)
+        }
+
+        pipe = self.redis_client.pipeline()
+        pipe.zunionstore(key, weights)
+        pipe.zremrangebyrank(key, 0, -self.WINDOW_RANKING_SIZE - 1)
+        pipe.expire(key, settings.IMAGE_RANKING_REFRESH_SECONDS)
+        pipe.execute()
+        return key
 
 
 class ImageViewService:
+    """
+    Views are buffered in Redis and moved into `Image.views` by
+    `flush_image_views`; the displayed total is the stored count plus the
+    views still pending in Redis.
+    """
+
     def __init__(self):
         self.redis_service = RedisService()
     
     def record_view(self, image):
-        total_views = self.redis_service.increment_views(image.id)
-        self.redis_service.increment_ranking(image.id)
-        return total_views
+        try:
+            pending_views = self.redis_service.record_view(image.id)
+        except redis.RedisError:
+            logger.exception('Could not record view of image %s', image.id)
+            return image.views
+        return image.views + pending_views
+    
+    def flush(self, batch_size=500):
+        # Overlapping flushes would both apply the same flushing hash.
+        token = self.redis_service.acquire_flush_lock()
+        if token is None:
+            logger.info('Skipping view flush, another one is running')
+            return 0
+        try:
+            pending = list(self.redis_service.take_pending_views().items())
+            # All batches commit together; the flushing hash is only dropped
+            # once they have, so a failed flush is retried with the same counts.
+            with transaction.atomic():
+                for start in range(0, len(pending), batch_size):
+                    batch = pending[start:start + batch_size]
+                    Image.objects.filter(id__in=[image_id for image_id, _ in batch]).update(
+                        views=F('views') + Case(
+                            *[When(id=image_id, then=Value(views)) for image_id, views in batch],
+                            default=Value(0),
+                            output_field=PositiveIntegerField()
+                        )
+                    )
+                transaction.on_commit(self.redis_service.clear_flushed_views)
+        finally:
+            self.redis_service.release_flush_lock(token)
+        return sum(views for _, views in pending)
 
 
 class ImageRankingService:
+    """
+    Serves rankings from a snapshot in the Django cache holding the ordered
+    card data (title, URL, thumbnail picture, views), rebuilt every
+    IMAGE_RANKING_REFRESH_SECONDS or when `invalidate` is called.
+    """
+    SNAPSHOT_KEY = "image_ranking_snapshot:{window}:{count}"
+    THUMBNAIL_ALIAS = "ranking"
+    DEFAULT_COUNT = 10
+
     def __init__(self):
         self.redis_service = RedisService()
     
-    def get_most_viewed_images(self, count=10):
-        ranking_ids = self.redis_service.get_top_ranked_images(count)
+    def get_most_viewed_images(self, count=10, window=None):
+        ranking_ids = self.redis_service.get_top_ranked_images(count, window)
         if not ranking_ids:
             return []
         
-        images = list(Image.objects.filter(id__in=ranking_ids))
-        return sorted(images, key=lambda x: ranking_ids.index(x.id))
+        images = Image.objects.ready().in_bulk(ranking_ids)
+        return [images[image_id] for image_id in ranking_ids if image_id in images]
+    
+    def get_ranking(self, count=DEFAULT_COUNT, window=None):
+        key = self.SNAPSHOT_KEY.format(window=window or "all", count=count)
+        cards = cache.get(key)
+        if cards is None:
+            images = ImageThumbnailService.attach_pictures(
+                self.get_most_viewed_images(count, window), self.THUMBNAIL_ALIAS
+            )
+            cards = [self._build_card(image) for image in images]
+            cache.set(key, cards, settings.IMAGE_RANKING_REFRESH_SECONDS)
+        return cards
+    
+    @classmethod
+    def invalidate(cls):
+        cache.delete_many([
+            cls.SNAPSHOT_KEY.format(window=window, count=cls.DEFAULT_COUNT)
+            for window in ["all", *RedisService.RANKING_WINDOWS]
+        ])
+    
+    def _build_card(self, image):
+        return {
+            "id": image.id,
+            "title": image.title,
+            "url": image.get_absolute_url(),
+            "picture": image.picture,
+            "views": image.views,
+        }
+
+
+class ImageLikeService:
+    """
+    Applies like/unlike changes for one user in a single transaction:
+    one SELECT locking the images, one for the current state, at most one
+    INSERT and one DELETE on the through table, and one counter UPDATE per
+    direction. Repeating a change is a no-op.
+    """
+    ACTIONS = ('like', 'unlike')
+    MAX_BATCH_SIZE = 100
+    # Ids are 64-bit; larger numbers overflow the database driver.
+    MAX_ID = 2 ** 63 - 1
+
+    @classmethod
+    def parse_id(cls, value):
+        """Return `value` as an image id, or None if it cannot be one."""
+        try:
+            image_id = int(value)
+        except (TypeError, ValueError):
+            return None
+        return image_id if 0 < image_id <= cls.MAX_ID else None
+
+    @classmethod
+    def apply(cls, user, changes):
+        requested = {}
+        for image_id, action in changes:
+            requested[int(image_id)] = action
+
+        through = Image.users_like.through
+        with transaction.atomic():
+            # Concurrent changes to the same images wait here, so the state
+            # read below is current and the counter deltas are exact.
+            locked = list(
+                Image.objects.select_for_update().filter(id__in=requested)
+                .order_by('id').values_list('id', flat=True)
+            )
+            images = {
+                image.id: image
+                for image in Image.objects.filter(id__in=locked).annotate(
+                    is_liked=Exists(
+                        through.objects.filter(image_id=OuterRef('pk'), user_id=user.id)
+                    )
+                )
+            }
+
+            liked = [
+                image for image_id, image in images.items()
+                if requested[image_id] == 'like' and not image.is_liked
+            ]
+            unliked = [
+                image for image_id, image in images.items()
+                if requested[image_id] == 'unlike' and image.is_liked
+            ]
+
+            if liked:
+                through.objects.bulk_create(
+                    [through(image_id=image.id, user_id=user.id) for image in liked],
+                    ignore_conflicts=True
+                )
+                Image.objects.filter(id__in=[image.id for image in liked]).update(
+                    total_likes=F('total_likes') + 1
+                )
+            if unliked:
+                through.objects.filter(
+                    user_id=user.id, image_id__in=[image.id for image in unliked]
+                ).delete()
+                Image.objects.filter(id__in=[image.id for image in unliked], total_likes__gt=0).update(
+                    total_likes=F('total_likes') - 1
+                )
+
+            for image in liked:
+                image.total_likes += 1
+                create_action(user, 'liked', image)
+            for image in unliked:
+                image.total_likes = max(image.total_likes - 1, 0)
+
+        return {
+            image_id: {
+                'liked': requested[image_id] == 'like',
+                'total_likes': images[image_id].total_likes,
+            } if image_id in images else None
+            for image_id in requested
+        }
+
+
+class ImageThumbnailService:
+    @staticmethod
+    def attach_pictures(images, alias):
+        """Set `picture` (see ThumbnailService.resolve_pictures) on every image in one batch."""
+        pictures = ThumbnailService.resolve_pictures([image.image for image in images], alias)
+        for image, picture in zip(images, pictures):
+            image.picture = picture
+        return images
 
 
 class ImagePaginationService:
+    # Fields needed to render an image card in the list and its JSON feed.
+    CARD_FIELDS = ('id', 'title', 'slug', 'image', 'created')
+
+    @classmethod
+    def get_cards(cls):
+        return Image.objects.ready().only(*cls.CARD_FIELDS)
+
     @staticmethod
-    def paginate_images(images_queryset, page, per_page=6):
-        paginator = Paginator(images_queryset, per_page)
-        
-        try:
-            images_page = paginator.page(page)
-            return images_page, False
-        except PageNotAnInteger:
-            images_page = paginator.page(1)
-            return images_page, False
-        except EmptyPage:
-            images_page = paginator.page(paginator.num_pages)
-            return images_page, True
+    def paginate_images(images_queryset, cursor=None, per_page=6):
+        paginator = CursorPaginator(images_queryset, per_page)
+        images_page = paginator.page(cursor)
+        return images_page, not images_page.has_next()
@@ -1,9 +1,89 @@
-from django.db.models.signals import m2m_changed
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
+
+from actions.snapshots import ActionSnapshotService
+from bookmarks.thumbnails import ThumbnailService
 from .models import Image
+from .search import ImageSearchIndex
 
 
 @receiver(m2m_changed, sender=Image.users_like.through)
-def users_like_changed(sender, instance, **kwargs):
-    instance.total_likes = instance.users_like.count()
-    instance.save()
\ No newline at end of file
+def users_like_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            instance._cleared_liked_image_ids = list(
+                sender.objects.filter(user_id=instance.pk).values_list('image_id', flat=True)
+            )
+        return
+
+    if action == 'post_clear':
+        if reverse:
+            image_ids = instance.__dict__.pop('_cleared_liked_image_ids', [])
+            Image.objects.filter(pk__in=image_ids).update(
+                total_likes=Greatest(F('total_likes') - 1, Value(0))
+            )
+        else:
+            Image.objects.filter(pk=instance.pk).update(total_likes=0)
+            instance.total_likes = 0
+        return
+
+    if action == 'pre_remove':
+        # pk_set holds the requested pks, not the rows that will be deleted;
+        # keep only the pairs that exist so removing a non-like is a no-op.
+        if pk_set:
+            if reverse:
+                existing = sender.objects.filter(user_id=instance.pk, image_id__in=pk_set)
+                instance._removed_like_pks = set(existing.values_list('image_id', flat=True))
+            else:
+                existing = sender.objects.filter(image_id=instance.pk, user_id__in=pk_set)
+                instance._removed_like_pks = set(existing.values_list('user_id', flat=True))
+        return
+
+    if action == 'post_remove':
+        pk_set = instance.__dict__.pop('_removed_like_pks', set())
+
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+
+    if reverse:
+        delta = 1 if action == 'post_add' else -1
+        Image.objects.filter(pk__in=pk_set).update(
+            total_likes=Greatest(F('total_likes') + delta, Value(0))
+        )
+    else:
+        delta = len(pk_set) if action == 'post_add' else -len(pk_set)
+        Image.objects.filter(pk=instance.pk).update(
+            total_likes=Greatest(F('total_likes') + delta, Value(0))
+        )
+        instance.total_likes = max(instance.total_likes + delta, 0)
+
+
+@receiver(post_save, sender=Image)
+def generate_image_thumbnails(sender, instance, update_fields, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if instance.status == Image.Status.READY:
+        ThumbnailService.generate_later(instance.image)
+
+
+@receiver(post_save, sender=Image)
+def index_image(sender, instance, update_fields, **kwargs):
+    if update_fields is not None and not {'title', 'description'} & set(update_fields):
+        return
+    ImageSearchIndex.index([instance])
+
+
+@receiver(post_delete, sender=Image)
+def unindex_image(sender, instance, **kwargs):
+    ImageSearchIndex.remove([instance.id])
+
+
+@receiver(post_delete, sender=Image)
+def invalidate_image_snapshots(sender, instance, **kwargs):
+    # Rebuilt without the target once the delete is committed; the instance
+    # loses its pk after this signal, so keep a copy of it.
+    target = Image(id=instance.id)
+    transaction.on_commit(lambda: ActionSnapshotService.mark_target_stale(target))
@@ -0,0 +1,132 @@
+import operator
+from functools import reduce
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from PIL import Image as PILImage
+
+from .models import Image
+
+HASH_BITS = 64
+BAND_BITS = 16
+BANDS = HASH_BITS // BAND_BITS
+BAND_MASK = (1 << BAND_BITS) - 1
+HASH_MASK = (1 << HASH_BITS) - 1
+
+
+def difference_hash(file):
+    """
+    64-bit dHash: the picture is shrunk to 9x8 grey pixels and each bit
+    records whether a pixel is brighter than its right-hand neighbour, so
+    resized, recompressed or slightly retouched copies hash alike.
+    """
+    file.seek(0)
+    with PILImage.open(file) as picture:
+        # Let the JPEG decoder downscale while decoding instead of
+        # decoding full-size pixels that are thrown away right after.
+        picture.draft("L", (64, 64))
+        pixels = list(picture.convert("L").resize((9, 8), PILImage.Resampling.LANCZOS).getdata())
+    file.seek(0)
+
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            left = pixels[row * 9 + column]
+            value = (value << 1) | (left > pixels[row * 9 + column + 1])
+    return value
+
+
+def to_signed(value):
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def to_unsigned(value):
+    return value & HASH_MASK
+
+
+def bands(value):
+    value = to_unsigned(value)
+    return [(value >> (BAND_BITS * i)) & BAND_MASK for i in range(BANDS)]
+
+
+def neighbours(band, radius):
+    """Every band value within `radius` bits of `band`."""
+    found = {band}
+    frontier = {band}
+    for _ in range(radius):
+        frontier = {value ^ (1 << bit) for value in frontier for bit in range(BAND_BITS)} - found
+        found |= frontier
+    return found
+
+
+def hamming_distance(a, b):
+    return (to_unsigned(a) ^ to_unsigned(b)).bit_count()
+
+
+def hash_stored_file(name):
+    """Hash a file in default storage; used by the process pool of hash_images."""
+    with default_storage.open(name, "rb") as f:
+        return to_signed(difference_hash(f))
+
+
+class SimilarImageService:
+    """
+    Near-duplicate lookup over perceptual hashes using multi-index hashing:
+    the 64-bit hash is split into four indexed 16-bit bands. Two hashes at
+    most `d` bits apart have at least one band at most `d // 4` bits apart,
+    so candidates come from a few indexed IN lookups instead of a scan of
+    the library, and are then filtered on their exact distance.
+    """
+
+    @staticmethod
+    def hash_file(file):
+        """Signed perceptual hash of an image file, or None if it cannot be decoded."""
+        try:
+            return to_signed(difference_hash(file))
+        except (OSError, ValueError, PILImage.DecompressionBombError):
+            return None
+
+    @staticmethod
+    def hash_fields(phash):
+        fields = dict.fromkeys(Image.PHASH_FIELDS)
+        if phash is not None:
+            fields["phash"] = phash
+            for i, band in enumerate(bands(phash)):
+                fields[f"phash_{i}"] = band
+        return fields
+
+    @classmethod
+    def set_hash(cls, image, phash):
+        for field, value in cls.hash_fields(phash).items():
+            setattr(image, field, value)
+
+    @classmethod
+    def find_similar(cls, image, limit=None, max_distance=None):
+        """Ready images within `max_distance` bits of `image`, closest first."""
+        if image.phash is None:
+            return []
+        limit = limit or settings.SIMILAR_IMAGE_COUNT
+        max_distance = settings.SIMILAR_IMAGE_MAX_DISTANCE if max_distance is None else max_distance
+        radius = max_distance // BANDS
+
+        condition = reduce(operator.or_, (
+            Q(**{f"phash_{i}__in": neighbours(band, radius)})
+            for i, band in enumerate(bands(image.phash))
+        ))
+
+        candidates = (
+            Image.objects.ready().filter(condition).exclude(id=image.id)
+            .only("id", "title", "slug", "image", "phash", "total_likes").order_by()
+        )
+        matches = [
+            (hamming_distance(image.phash, candidate.phash), candidate)
+            for candidate in candidates
+        ]
+        matches = [match for match in matches if match[0] <= max_distance]
+        matches.sort(key=lambda match: (match[0], -match[1].total_likes, -match[1].id))
+        similar = []
+        for distance, candidate in matches[:limit]:
+            candidate.phash_distance = distance
+            similar.append(candidate)
+        return similar
@@ -0,0 +1,21 @@
+from django import template
+
+register = template.Library()
+
+
+@register.inclusion_tag('images/picture.html')
+def picture(picture, alt='', css_class='', sizes=None):
+    """
+    Render a <picture> for a dict from ThumbnailService.resolve_pictures,
+    letting the browser pick AVIF/WebP at the width it needs.
+
+        {% picture image.picture alt=image.title %}
+    """
+    if picture and sizes is None:
+        sizes = f"{picture['width']}px"
+    return {
+        'picture': picture,
+        'alt': alt,
+        'css_class': css_class,
+        'sizes': sizes,
+    }
@@ -7,7 +7,13 @@ app_name = "images"
 urlpatterns = [
     path("create/", views.image_create, name="create"),
     path("detail/<int:id>/<slug:slug>/", views.image_detail, name="detail"),
+    path("status/<int:id>/", views.image_status, name="status"),
     path("like/", views.image_like, name="like"),
+    path("like/batch/", views.image_like_batch, name="like_batch"),
+    path("import/", views.bookmark_import, name="import"),
+    path("import/<int:id>/", views.bookmark_import_status, name="import_status"),
     path("", views.image_list, name="list"),
+    path("feed/", views.image_list_feed, name="list_feed"),
     path("ranking/", views.image_ranking, name="ranking"),
+    path("search/", views.image_search, name="search"),
 ]
\ No newline at end of file
@@ -1,16 +1,29 @@
+import json
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.utils.decorators import method_decorator
 from django.views.generic import ListView, DetailView, CreateView
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
+from django.urls import reverse
+
+from bookmarks.pagination import CursorPaginationMixin
 
-from actions.utils import create_action
-from .forms import ImageCreateForm
-from .models import Image
-from .services import ImageViewService, ImageRankingService, ImagePaginationService
+from .forms import BookmarkImportForm, ImageCreateForm
+from .imports import BookmarkImportService
+from .ingest import ImageIngestService
+from .models import BookmarkImport, Image
+from .recommendations import ImageRecommendationService
+from .search import ImageSearchIndex, SearchCursorPaginator
+from .similarity import SimilarImageService
+from .services import (
+    ImageViewService, ImageRankingService, ImagePaginationService, ImageLikeService,
+    ImageThumbnailService, RedisService
+)
 
 
 class ImageCreateView(LoginRequiredMixin, CreateView):
@@ -27,8 +40,8 @@ class ImageCreateView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         form.instance.user = self.request.user
         response = super().form_valid(form)
-        create_action(self.request.user, "bookmarked image", self.object)
-        messages.success(self.request, "Image added successfully")
+        ImageIngestService.submit(self.object)
+        messages.success(self.request, "Image bookmarked, it will appear once it has been downloaded")
         return response
     
     def get_context_data(self, **kwargs):
@@ -43,10 +56,22 @@ class ImageDetailView(DetailView):
     context_object_name = 'image'
     slug_field = 'slug'
     pk_url_kwarg = 'id'
+    recent_likers_count = 24
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['section'] = 'images'
+        ImageThumbnailService.attach_pictures([self.object], 'detail')
+        context['similar_images'] = ImageThumbnailService.attach_pictures(
+            SimilarImageService.find_similar(self.object), 'ranking'
+        )
+        context['recommended_images'] = ImageThumbnailService.attach_pictures(
+            ImageRecommendationService.for_image(self.object), 'ranking'
+        )
+        context['recent_likers'] = self.object.get_recent_likers(self.recent_likers_count)
+        context['is_liked'] = (
+            self.request.user.is_authenticated and self.object.is_liked_by(self.request.user)
+        )
         
         view_service = ImageViewService()
         context['total_views'] = view_service.record_view(self.object)
@@ -58,65 +83,174 @@ class ImageListView(LoginRequiredMixin, ListView):
     model = Image
     template_name = 'images/image/list.html'
     context_object_name = 'images'
+    per_page = 8
 
     def get_queryset(self):
-        return Image.objects.select_related('user').recent()
+        return ImagePaginationService.get_cards()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        page = self.request.GET.get("page", 1)
+        cursor = self.request.GET.get("cursor")
         images_page, is_last_page = ImagePaginationService.paginate_images(
-            self.get_queryset(), page, per_page=8
+            self.object_list, cursor, per_page=self.per_page
         )
 
+        ImageThumbnailService.attach_pictures(images_page, 'list')
+
         context['images'] = images_page
         context['is_last_page'] = is_last_page
         context['section'] = 'images'
         return context
 
 
+class ImageListFeedView(ImageListView):
+    """The image list as JSON cards, fetched page by page by the infinite scroll."""
+
+    def render_to_response(self, context, **response_kwargs):
+        images_page = context['images']
+        return JsonResponse({
+            "status": "ok",
+            "images": [
+                {
+                    "id": image.id,
+                    "title": image.title,
+                    "url": image.get_absolute_url(),
+                    "picture": image.picture,
+                }
+                for image in images_page
+            ],
+            "next_cursor": images_page.next_cursor,
+        })
+
+
+class ImageSearchView(LoginRequiredMixin, CursorPaginationMixin, ListView):
+    template_name = 'images/image/search.html'
+    context_object_name = 'images'
+    paginate_by = 12
+    paginator_class = SearchCursorPaginator
+    cursor_field = 'search_rank'
+
+    def get_search_query(self):
+        return self.request.GET.get('q', '').strip()
+
+    def get_queryset(self):
+        return ImageSearchIndex.search(self.get_search_query())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        ImageThumbnailService.attach_pictures(context['images'], 'list')
+        context['section'] = 'images'
+        context['query'] = self.get_search_query()
+        return context
+
 
 class ImageRankingView(LoginRequiredMixin, ListView):
     template_name = 'images/image/ranking.html'
     context_object_name = 'most_viewed'
     
+    def get_window(self):
+        window = self.request.GET.get('window')
+        return window if window in RedisService.RANKING_WINDOWS else None
+    
     def get_queryset(self):
         ranking_service = ImageRankingService()
-        return ranking_service.get_most_viewed_images()
+        return ranking_service.get_ranking(window=self.get_window())
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['section'] = 'images'
+        context['window'] = self.get_window()
         return context
 
 
 @require_POST
 @login_required
 def image_like(request):
-    image_id = request.POST.get("id")
+    image_id = ImageLikeService.parse_id(request.POST.get("id"))
     action = request.POST.get("action")
     
-    if not image_id or action not in ['like', 'unlike']:
+    if image_id is None or action not in ImageLikeService.ACTIONS:
         return JsonResponse({"status": "error", "message": "Invalid request"})
 
-    try:
-        image = Image.objects.get(id=image_id)
-        
-        if action == "like":
-            if not image.is_liked_by(request.user):
-                image.users_like.add(request.user)
-                create_action(request.user, "liked", image)
-        else:
-            if image.is_liked_by(request.user):
-                image.users_like.remove(request.user)
-        
-        return JsonResponse({"status": "ok"})
-    except Image.DoesNotExist:
+    result = ImageLikeService.apply(request.user, [(image_id, action)])[image_id]
+    if result is None:
         return JsonResponse({"status": "error", "message": "Image not found"})
 
+    return JsonResponse({"status": "ok", **result})
+
+
+@require_POST
+@login_required
+def image_like_batch(request):
+    try:
+        changes = [
+            (ImageLikeService.parse_id(change["id"]), change["action"])
+            for change in json.loads(request.body)["likes"]
+        ]
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({"status": "error", "message": "Invalid request"})
+
+    if len(changes) > ImageLikeService.MAX_BATCH_SIZE or any(
+        image_id is None or action not in ImageLikeService.ACTIONS for image_id, action in changes
+    ):
+        return JsonResponse({"status": "error", "message": "Invalid request"})
+
+    results = ImageLikeService.apply(request.user, changes)
+    return JsonResponse({
+        "status": "ok",
+        "results": [
+            {"id": image_id, "status": "ok", **result} if result is not None
+            else {"id": image_id, "status": "error", "message": "Image not found"}
+            for image_id, result in results.items()
+        ],
+    })
+
+
+@login_required
+def image_status(request, id):
+    image = get_object_or_404(Image, id=id)
+    data = {"status": image.status}
+    if image.status == Image.Status.READY:
+        data["url"] = image.image.url
+    elif image.status == Image.Status.FAILED:
+        data["message"] = image.error
+    return JsonResponse(data)
+
+
+@require_POST
+@login_required
+def bookmark_import(request):
+    form = BookmarkImportForm(request.POST, request.FILES)
+    if not form.is_valid():
+        return JsonResponse({"status": "error", "message": form.errors["file"][0]}, status=400)
+
+    with transaction.atomic():
+        job = BookmarkImportService.create(request.user, form.cleaned_data["file"])
+        BookmarkImportService.submit(job)
+    return JsonResponse({
+        "status": "ok",
+        "id": job.id,
+        "status_url": reverse("images:import_status", args=[job.id]),
+    }, status=202)
+
+
+@login_required
+def bookmark_import_status(request, id):
+    job = get_object_or_404(BookmarkImport, id=id, user=request.user)
+    return JsonResponse({
+        "status": job.status,
+        "rows_processed": job.rows_processed,
+        "imported": job.imported,
+        "skipped": job.skipped,
+        "failed": job.failed,
+        "errors": job.errors,
+    })
+
 
 image_create = ImageCreateView.as_view()
 image_detail = ImageDetailView.as_view()
 image_list = ImageListView.as_view()
-image_ranking = ImageRankingView.as_view()
\ No newline at end of file
+image_list_feed = ImageListFeedView.as_view()
+image_ranking = ImageRankingView.as_view()
+image_search = ImageSearchView.as_view()
\ No newline at end of file